@@ -0,0 +1,124 @@
+import concurrent.futures
+import time
+import pygame
+
+
+class Loader:
+    """Decodes assets on a thread pool so the game loop can start before they are ready.
+
+    Image and sound decoding in pygame releases the GIL, so assets submitted together load in parallel.
+    """
+    instance = None
+
+    @staticmethod
+    def get_instance():
+        if Loader.instance is None:
+            Loader.instance = Loader()
+        return Loader.instance
+
+    def __init__(self, workers=None):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets")
+        self.futures = {}
+        self.timings = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def submit(self, key, function, *args):
+        """Starts loading an asset in the background unless it has already been submitted."""
+        if key in self.futures:
+            return
+
+        def task():
+            start = time.perf_counter()
+            result = function(*args)
+            self.timings[key] = time.perf_counter() - start
+            return result
+
+        self.futures[key] = self.executor.submit(task)
+
+    def submitted(self, key):
+        """Checks if an asset has been submitted for loading."""
+        return key in self.futures
+
+    def ready(self, key):
+        """Checks if an asset has finished loading."""
+        future = self.futures.get(key)
+        return future is not None and future.done()
+
+    def result(self, key, wait=True):
+        """Returns a loaded asset, waiting for it if necessary, or None if it is not ready and wait is False."""
+        future = self.futures[key]
+        if not wait and not future.done():
+            return None
+        return future.result()
+
+    def pending(self):
+        """Returns the number of assets that are still loading."""
+        pending = sum(not future.done() for future in self.futures.values())
+        if pending == 0 and self.finished is None and self.futures:
+            self.finished = time.perf_counter()
+        return pending
+
+    def wait(self):
+        """Blocks until every submitted asset has finished loading."""
+        concurrent.futures.wait(self.futures.values())
+        self.pending()
+
+
+class Assets:
+    """A cache of converted and pre-scaled images shared by all entities and spawners."""
+    instance = None
+
+    @staticmethod
+    def get_instance():
+        if Assets.instance is None:
+            Assets.instance = Assets()
+        return Assets.instance
+
+    def __init__(self):
+        self.images = {}
+        self.hits = 0
+        self.misses = 0
+
+    def preload(self, paths):
+        """Starts decoding images in the background."""
+        loader = Loader.get_instance()
+        for path in paths:
+            loader.submit(path, pygame.image.load, path)
+
+    def image(self, path, size=None):
+        """Returns the image at the path converted for fast blitting and optionally scaled to a size.
+
+        Images that are still being preloaded are waited for, as they decode in milliseconds.
+        """
+        key = (path, size)
+        image = self.images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        if size is None:
+            loader = Loader.get_instance()
+            if loader.submitted(path):
+                image = loader.result(path).convert_alpha()
+            else:
+                image = pygame.image.load(path).convert_alpha()
+        else:
+            image = pygame.transform.scale(self.image(path), size)
+        self.images[key] = image
+        return image
+
+    def clear(self):
+        """Removes all cached images, for example after the display mode changes."""
+        self.images.clear()
+
+    def stats(self):
+        """Returns the number of cached images, their memory in bytes and the cache hits and misses."""
+        return {
+            "images": len(self.images),
+            "bytes": sum(image.get_bytesize() * image.get_width() * image.get_height()
+                         for image in self.images.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,120 @@
+import governor
+import particles
+import rng
+import numpy as np
+import pygame
+
+
+class Starfield:
+    """A parallax starfield pre-rendered into tileable layers, one for each speed band.
+
+    Stars are drawn into their layer once and each layer is scrolled as a whole, so a frame costs two blits
+    per layer no matter how many stars there are. The blits of all layers are issued in one call.
+    """
+    def __init__(self, surface, stars=100, layers=3, speed=(-7, -3), side=(1, 5), color=(255, 255, 255)):
+        self.surface = surface
+        self.viewport = surface.get_rect()
+        self.color = color
+        self.layers = []
+        self.sequence = []
+
+        width, height = self.viewport.size
+        bands = np.linspace(speed[0], speed[1], layers + 1)
+        for index in range(layers):
+            image = pygame.Surface((width, height), 0, surface)
+            image.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+            self.layers.append({
+                "image": image,
+                "speed": (bands[index] + bands[index + 1]) / 2,
+                "offset": 0.0,
+                "shift": 0.0,
+                "stars": [],
+                "scaled": {},
+            })
+
+        for _ in range(stars):
+            speed_value = rng.random.uniform(*speed)
+            index = min(int((speed_value - speed[0]) / (speed[1] - speed[0]) * layers), layers - 1)
+            star = pygame.Rect(
+                rng.random.randint(0, width - 1),
+                rng.random.randint(0, height - 1),
+                *(rng.random.randint(*side),) * 2,
+            )
+            layer = self.layers[index]
+            layer["image"].fill(color, star)
+            if star.right > width:
+                layer["image"].fill(color, star.move(-width, 0).clip(self.viewport))
+            layer["stars"].append(star)
+
+        for layer in self.layers:
+            layer["stars"] = np.array([tuple(star) for star in layer["stars"]], dtype=np.int32).reshape(-1, 4)
+
+    def __len__(self):
+        return sum(len(layer["stars"]) for layer in self.layers)
+
+    def visible(self):
+        """Returns the layers to draw, dropping the far, slow layers first when the governor lowers quality."""
+        return self.layers[:governor.Governor.get_instance().layers(len(self.layers))]
+
+    def update(self, dt):
+        """Scrolls each layer by its speed scaled to dt, wrapping around the width of the viewport."""
+        width = self.viewport.width
+        scale = dt / particles.reference
+        for layer in self.layers:
+            layer["shift"] = -layer["speed"] * scale
+            layer["offset"] = (layer["offset"] + layer["shift"]) % width
+
+    def offset(self, layer, alpha):
+        """Returns the integer scroll offset of a layer, interpolated by alpha."""
+        if alpha >= 1:
+            return int(layer["offset"])
+        return int((layer["offset"] - layer["shift"] * (1 - alpha)) % self.viewport.width)
+
+    def scaled(self, layer, scale):
+        """Returns the image of a layer at a render scale, rendered from its stars on first use.
+
+        Stars are redrawn rather than the layer image scaled down, so the smallest stars keep at least one pixel.
+        """
+        if scale == 1:
+            return layer["image"]
+        image = layer["scaled"].get(scale)
+        if image is None:
+            width, height = self.viewport.size
+            image = pygame.Surface((round(width * scale), round(height * scale)), 0, self.surface)
+            image.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+            for x, y, side, _ in layer["stars"].tolist():
+                star = pygame.Rect(round(x * scale), round(y * scale), *(max(1, round(side * scale)),) * 2)
+                image.fill(self.color, star)
+                if star.right > image.get_width():
+                    image.fill(self.color, star.move(-image.get_width(), 0).clip(image.get_rect()))
+            layer["scaled"][scale] = image
+        return image
+
+    def blits(self, sequence, alpha=1.0, scale=1.0):
+        """Fills a sequence with two blits for each visible layer, one on each side of the wrap point."""
+        width = round(self.viewport.width * scale)
+        sequence.clear()
+        for layer in self.visible():
+            image = self.scaled(layer, scale)
+            offset = self.offset(layer, alpha) if scale == 1 else round(self.offset(layer, alpha) * scale) % width
+            sequence.append((image, (-offset, 0)))
+            if offset:
+                sequence.append((image, (width - offset, 0)))
+
+    def draw(self, surface, alpha=1.0):
+        """Draws the visible layers onto the surface in one blits call."""
+        self.blits(self.sequence, alpha)
+        surface.blits(self.sequence, doreturn=False)
+
+    def rects(self, alpha=1.0):
+        """Returns an integer array of the on-screen (left, top, width, height) rects of every star."""
+        width = self.viewport.width
+        rects = []
+        for layer in self.visible():
+            stars = layer["stars"].copy()
+            stars[:, 0] = (stars[:, 0] - self.offset(layer, alpha)) % width
+            rects.append(stars)
+            wrapped = stars[stars[:, 0] + stars[:, 2] > width]
+            wrapped[:, 0] -= width
+            rects.append(wrapped)
+        return np.concatenate(rects)
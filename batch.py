@@ -0,0 +1,166 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import particles
+import entities
+import controllers
+import game
+import rng
+import argparse
+import itertools
+import json
+import multiprocessing
+import time
+import numpy as np
+import pygame
+
+
+class Autopilot:
+    """A simple AI input source that lines up with the enemy closest to the left edge and keeps firing."""
+    def __init__(self, tolerance=10, rockets=3):
+        self.tolerance = tolerance
+        self.rockets = rockets
+        self.state = controllers.InputState()
+
+    def timestep(self, dt):
+        """Returns the dt of the next frame."""
+        return dt
+
+    def poll(self):
+        """Chooses the input for the current frame from the positions of the player and enemies."""
+        pygame.event.pump()
+        state = controllers.InputState(laser=True)
+        player = next(iter(entities.Player.group), None)
+        if player and entities.Enemy.group:
+            target = min(entities.Enemy.group, key=lambda enemy: enemy.rect.centerx)
+            offset = target.rect.centery - player.rect.centery
+            state.up = offset < -self.tolerance
+            state.down = offset > self.tolerance
+            state.rocket = len(entities.Enemy.group) >= self.rockets
+        self.state = state
+        return state
+
+
+def initialize():
+    """Sets up pygame with a dummy display in each worker process."""
+    pygame.init()
+    pygame.display.set_mode((1920, 1080))
+
+
+def simulate(config):
+    """Runs one seeded game without rendering until the player dies or the frame limit, returning its outcome."""
+    rng.seed(config["seed"])
+    world = game.Game(surface=pygame.display.get_surface(), controls=Autopilot())
+
+    world.enemies.interval = config["interval"]
+    world.enemies.delta = config["delta"]
+    world.enemies.minimum = config["minimum"]
+    for props in world.enemies.types:
+        props["damage"] = round(props["damage"] * config["damage"])
+
+    dt = config["dt"]
+    peak_entities = 0
+    peak_particles = 0
+    start = time.perf_counter()
+    while world.frame < config["frames"] and world.player.alive():
+        world.update(dt)
+        peak_entities = max(peak_entities, len(entities.Entity.group))
+        peak_particles = max(peak_particles, len(particles.Particle.group) + len(particles.Burst.system))
+    elapsed = time.perf_counter() - start
+
+    outcome = {
+        "survival": world.frame * dt,
+        "survived": world.player.alive(),
+        "kills": entities.Enemy.destroyed,
+        "damage_taken": world.player.damage_taken,
+        "peak_entities": peak_entities,
+        "peak_particles": peak_particles,
+        "frame_ms": 1000 * elapsed / max(1, world.frame),
+    }
+    game.Game.reset()
+    return config, outcome
+
+
+def aggregate(results):
+    """Groups game outcomes by spawner parameters and averages them."""
+    groups = {}
+    for config, outcome in results:
+        key = (config["interval"], config["delta"], config["minimum"], config["damage"])
+        groups.setdefault(key, []).append(outcome)
+
+    rows = []
+    for (interval, delta, minimum, damage), outcomes in sorted(groups.items()):
+        survival = np.array([outcome["survival"] for outcome in outcomes])
+        rows.append({
+            "interval": interval,
+            "delta": delta,
+            "minimum": minimum,
+            "damage": damage,
+            "games": len(outcomes),
+            "survival_mean": float(survival.mean()),
+            "survival_p10": float(np.percentile(survival, 10)),
+            "survived": float(np.mean([outcome["survived"] for outcome in outcomes])),
+            "kills": float(np.mean([outcome["kills"] for outcome in outcomes])),
+            "damage_taken": float(np.mean([outcome["damage_taken"] for outcome in outcomes])),
+            "peak_entities": max(outcome["peak_entities"] for outcome in outcomes),
+            "peak_particles": max(outcome["peak_particles"] for outcome in outcomes),
+            "frame_ms": float(np.mean([outcome["frame_ms"] for outcome in outcomes])),
+        })
+    return rows
+
+
+def main():
+    """Command line entry point for parameter sweeps over many seeded games."""
+    parser = argparse.ArgumentParser(description="Simulates many headless games in parallel to tune the spawner.")
+    parser.add_argument("--games", type=int, default=100, help="games per parameter combination")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--frames", type=int, default=3600, help="frame limit per game")
+    parser.add_argument("--dt", type=float, default=1 / 60, help="fixed time step in seconds")
+    parser.add_argument("--interval", type=float, nargs="+", default=[5], help="initial spawn intervals")
+    parser.add_argument("--delta", type=float, nargs="+", default=[0.2], help="interval decreases per spawn")
+    parser.add_argument("--minimum", type=float, nargs="+", default=[3], help="minimum spawn intervals")
+    parser.add_argument("--damage", type=float, nargs="+", default=[1.0], help="enemy damage multipliers")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--output", help="file to write the aggregated table to as JSON")
+    args = parser.parse_args()
+
+    configs = [
+        {
+            "seed": args.seed + game_index,
+            "frames": args.frames,
+            "dt": args.dt,
+            "interval": interval,
+            "delta": delta,
+            "minimum": minimum,
+            "damage": damage,
+        }
+        for interval, delta, minimum, damage in itertools.product(args.interval, args.delta, args.minimum, args.damage)
+        for game_index in range(args.games)
+    ]
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.processes, initializer=initialize) as pool:
+        results = list(pool.imap_unordered(simulate, configs, chunksize=max(1, len(configs) // (args.processes * 8))))
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - start
+
+    rows = aggregate(results)
+    print(f"{'interval':>8} {'delta':>6} {'minimum':>7} {'damage':>6} {'games':>6} {'survival':>9} "
+          f"{'p10':>7} {'alive':>6} {'kills':>7} {'taken':>7} {'entities':>8} {'particles':>9} {'ms/frame':>8}")
+    for row in rows:
+        print(f"{row['interval']:>8g} {row['delta']:>6g} {row['minimum']:>7g} {row['damage']:>6g} "
+              f"{row['games']:>6d} {row['survival_mean']:>8.1f}s {row['survival_p10']:>6.1f}s "
+              f"{row['survived']:>6.0%} {row['kills']:>7.1f} {row['damage_taken']:>7.1f} "
+              f"{row['peak_entities']:>8d} {row['peak_particles']:>9d} {row['frame_ms']:>8.3f}")
+    print(f"{len(configs)} games in {elapsed:.1f} s ({60 * len(configs) / elapsed:.0f} games per minute)")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(rows, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import particles
+import entities
+import controllers
+import headless
+import game
+import assets
+import renderers
+import replays
+import collector
+import rng
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pygame
+
+
+class Scenario:
+    """A scripted benchmark scenario driven through the game loop. Override the hooks in subclass."""
+    name = "scenario"
+    frames = 600
+    script = staticmethod(headless.idle)
+    seed = None
+
+    def controls(self):
+        """Returns a fresh input source for a run."""
+        return controllers.ScriptedInput(self.script)
+
+    def setup(self, world):
+        """Prepares the world before the first frame."""
+        pass
+
+    def before_frame(self, world, frame):
+        """Called before every frame is updated."""
+        pass
+
+
+class Idle(Scenario):
+    """Only the starfield, without enemies or health pickups."""
+    name = "idle"
+
+    def setup(self, world):
+        world.enemies.interval = float("inf")
+        world.health.interval = float("inf")
+
+
+class Waves(Scenario):
+    """Steady enemy waves from the default EnemySpawner against a patrolling player."""
+    name = "waves"
+    frames = 1800
+    script = staticmethod(headless.patrol)
+
+
+class Detonation(Scenario):
+    """A rocket hitting an enemy in front of the player every few seconds, each producing 1000 bursts."""
+    name = "detonation"
+    frames = 900
+
+    def setup(self, world):
+        world.enemies.interval = float("inf")
+        world.health.interval = float("inf")
+
+    def before_frame(self, world, frame):
+        if frame % 300 == 0:
+            world.enemies.spawn()
+            enemy = list(entities.Enemy.group)[-1]
+            enemy.move_to((world.player.rect.centerx + 400, world.player.rect.centery))
+            enemy.timer = float("inf")
+            world.player.cooldown.get("rocket").timer = 0
+            world.player.rocket()
+
+
+class LateGame(Scenario):
+    """The enemy spawner interval at its minimum with the player firing continuously."""
+    name = "late-game"
+    frames = 1800
+    script = staticmethod(headless.patrol)
+
+    def setup(self, world):
+        world.enemies.interval = world.enemies.minimum
+        world.enemies.timer = world.enemies.minimum
+        world.player.health = world.player.max_health = float("inf")
+
+
+class Recorded(Scenario):
+    """A recorded session played back from a replay file, with its own seed, dt and governor quality."""
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        replay = replays.Replay(path)
+        self.seed = replay.seed
+        self.frames = len(replay)
+
+    def controls(self):
+        return replays.Replay(self.path)
+
+
+scenarios = [Idle(), Waves(), Detonation(), LateGame()]
+
+
+def percentiles(samples):
+    """Summarizes frame times in milliseconds."""
+    samples = np.asarray(samples) * 1000
+    return {
+        "mean": float(samples.mean()),
+        "p50": float(np.percentile(samples, 50)),
+        "p95": float(np.percentile(samples, 95)),
+        "p99": float(np.percentile(samples, 99)),
+        "max": float(samples.max()),
+    }
+
+
+def simulate(window, scenario, seed, dt, renderer, on_frame=None, driver=None):
+    """Runs a scenario from a fresh seeded world, calling on_frame with the world and renderer every frame."""
+    rng.seed(seed if scenario.seed is None else scenario.seed)
+    world = game.Game(surface=window, controls=scenario.controls())
+    renderer = renderers.create(renderer, world, driver=driver)
+    scenario.setup(world)
+    for frame in range(scenario.frames):
+        scenario.before_frame(world, frame)
+        if on_frame:
+            on_frame(world, renderer)
+        else:
+            world.update(dt)
+            renderer.render()
+    game.Game.reset()
+
+
+def measure(window, scenario, seed=0, dt=1 / 60, renderer="full", memory=True, driver=None):
+    """Runs a scenario and records per-frame update and draw times, object counts and peak memory.
+
+    Frames that take longer than dt count as hitches. Garbage collections are counted separately for frames
+    and for the idle time left in dt after each frame, which the tuned policy collects in. The texture renderer
+    uses the named SDL render driver.
+    """
+    update_times = []
+    draw_times = []
+    particle_counts = []
+    sprite_counts = []
+    collection = collector.Collector.get_instance()
+    collection.clear()
+
+    def on_frame(world, renderer):
+        start = time.perf_counter()
+        world.update(dt)
+        middle = time.perf_counter()
+        renderer.render()
+        end = time.perf_counter()
+
+        update_times.append(middle - start)
+        draw_times.append(end - middle)
+        particle_counts.append(len(particles.Particle.group) + len(particles.Burst.system))
+        sprite_counts.append(len(particles.Particle.group) + len(entities.Entity.group))
+        collection.end_frame()
+        collection.idle(dt - (end - start))
+
+    simulate(window, scenario, seed, dt, renderer, on_frame, driver)
+
+    frame_times = np.add(update_times, draw_times)
+    result = {
+        "frames": len(frame_times),
+        "update": percentiles(update_times),
+        "draw": percentiles(draw_times),
+        "frame": percentiles(frame_times),
+        "particles": {"mean": float(np.mean(particle_counts)), "max": int(np.max(particle_counts))},
+        "sprites": {"mean": float(np.mean(sprite_counts)), "max": int(np.max(sprite_counts))},
+        "hitches": int((frame_times > dt).sum()),
+        "gc": collection.metrics(),
+    }
+
+    if memory:
+        tracemalloc.start()
+        simulate(window, scenario, seed, dt, renderer, driver=driver)
+        result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result
+
+
+def compare(results, baseline, threshold, metric="p95"):
+    """Compares frame times against a baseline and returns the scenarios that regressed beyond the threshold."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        current = result["frame"][metric]
+        previous = baseline[name]["frame"][metric]
+        if previous > 0 and current > previous * (1 + threshold):
+            regressions.append((name, previous, current))
+    return regressions
+
+
+def main():
+    """Command line entry point for the benchmark runner."""
+    parser = argparse.ArgumentParser(description="Runs the frame-time benchmark scenarios.")
+    parser.add_argument("--scenario", action="append", choices=[scenario.name for scenario in scenarios],
+                        help="scenario to run, may be repeated (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the shared random generators")
+    parser.add_argument("--output", default="benchmark.json", help="file to write the results to")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed relative increase of the p95 frame time before failing")
+    parser.add_argument("--renderer", choices=renderers.renderers, default="full", help="rendering path")
+    parser.add_argument("--driver", help="SDL render driver of the texture renderer, such as software")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    parser.add_argument("--replay", action="append", default=[],
+                        help="replay file to run as an additional scenario named after the file, may be repeated")
+    parser.add_argument("--gc", choices=["default", "tuned"], default="default",
+                        help="garbage collection policy, tuned freezes startup objects and collects in idle time")
+    args = parser.parse_args()
+
+    pygame.init()
+    flags = 0 if renderers.resolve(args.renderer).display else pygame.HIDDEN
+    window = pygame.display.set_mode((1920, 1080), flags)
+    game.load_assets()
+    assets.Loader.get_instance().wait()
+
+    collection = collector.Collector.get_instance()
+    if args.gc == "tuned":
+        collection.tune()
+    collection.enable()
+
+    results = {}
+    for scenario in scenarios + [Recorded(path) for path in args.replay]:
+        if args.scenario and scenario.name not in args.scenario and not isinstance(scenario, Recorded):
+            continue
+        result = measure(window, scenario, seed=args.seed, renderer=args.renderer, memory=not args.no_memory,
+                         driver=args.driver)
+        results[scenario.name] = result
+        frame = result["frame"]
+        print(f"{scenario.name:<12} p50 {frame['p50']:6.2f} ms  p95 {frame['p95']:6.2f} ms  "
+              f"p99 {frame['p99']:6.2f} ms  max {frame['max']:6.2f} ms  "
+              f"particles {result['particles']['max']:5d}  sprites {result['sprites']['max']:5d}")
+        collections = result["gc"]
+        print(f"{'':<12} hitches {result['hitches']:4d}  gc {collections['collections']} "
+              f"max pause {collections['max pause']:6.2f} ms  total {collections['pause']:7.2f} ms  "
+              f"idle {collections['idle collections']} {collections['idle pause']:7.2f} ms")
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    pygame.quit()
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for name, previous, current in regressions:
+            print(f"{name} regressed: p95 {previous:.2f} ms -> {current:.2f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import profiler
+import gc
+import time
+import tracemalloc
+
+
+profile = profiler.Profiler.get_instance()
+
+
+class Collector:
+    """Times the pauses of the garbage collector per frame and, once tuned, moves its collections into idle time."""
+    instance = None
+
+    @staticmethod
+    def get_instance():
+        if Collector.instance is None:
+            Collector.instance = Collector()
+        return Collector.instance
+
+    def __init__(self):
+        self.enabled = False
+        self.tuned = False
+        self.young = 700
+        self.every = 10
+        self.idling = False
+        self.start = 0.0
+        self.averages = [0.0, 0.0, 0.0]
+
+        self.pending = 0
+        self.mark = 0
+        self.pause = 0.0
+        self.traced = 0
+
+        self.tracing = False
+        self.interval = 0
+        self.snapshot = None
+        self.sites = []
+
+        self.clear()
+
+    def enable(self):
+        """Starts timing collections and counting allocations."""
+        if not self.enabled:
+            gc.callbacks.append(self.callback)
+            self.enabled = True
+            self.mark = gc.get_count()[0]
+
+    def tune(self, young=2000, threshold=(20000, 20, 20), every=10):
+        """Freezes the objects alive now and raises the thresholds, so collections run in idle time instead."""
+        gc.collect()
+        gc.freeze()
+        gc.set_threshold(*threshold)
+        self.enable()
+        self.young = young
+        self.every = every
+        self.tuned = True
+
+    def trace(self, interval=600, frames=1):
+        """Starts tracing allocations with tracemalloc, comparing snapshots every interval of frames."""
+        self.enable()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.tracing = True
+        self.interval = interval
+        self.snapshot = tracemalloc.take_snapshot()
+        self.traced = tracemalloc.get_traced_memory()[0]
+
+    def callback(self, phase, info):
+        """Times each collection. Called by the garbage collector before and after it runs."""
+        if phase == "start":
+            self.pending += gc.get_count()[0] - self.mark
+            self.start = time.perf_counter()
+            return
+
+        duration = time.perf_counter() - self.start
+        generation = info["generation"]
+        average = self.averages[generation]
+        self.averages[generation] = duration if average == 0 else average * 0.9 + duration * 0.1
+        self.mark = gc.get_count()[0]
+        self.collected += info["collected"]
+        if self.idling:
+            self.idle_collections[generation] += 1
+            self.idle_pause += duration
+        else:
+            self.collections[generation] += 1
+            self.pause += duration
+            self.total_pause += duration
+            self.max_pause = max(self.max_pause, duration)
+        if profile.enabled:
+            profile.record(f"gc {generation}", self.start, duration)
+
+    def end_frame(self):
+        """Counts the allocations and collection pauses of the frame that ended."""
+        if not self.enabled:
+            return
+        count = gc.get_count()[0]
+        allocations = self.pending + count - self.mark
+        self.pending = 0
+        self.mark = count
+
+        self.frames += 1
+        self.allocations += allocations
+        self.max_allocations = max(self.max_allocations, allocations)
+        self.paused_frames += self.pause > 0
+        profile.count("gc allocations", allocations)
+        profile.count("gc pause us", round(self.pause * 1e6))
+        self.pause = 0.0
+
+        if self.tracing:
+            traced = tracemalloc.get_traced_memory()[0]
+            profile.count("traced kb", round((traced - self.traced) / 1024))
+            self.traced = traced
+            if self.frames % self.interval == 0:
+                self.compare()
+
+    def compare(self, limit=10):
+        """Compares a new tracemalloc snapshot with the last one and keeps the lines that allocated most since."""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        statistics = snapshot.compare_to(self.snapshot, "lineno")
+        self.sites = [
+            (str(statistic.traceback[0]), statistic.count_diff, statistic.size_diff)
+            for statistic in sorted(statistics, key=lambda statistic: statistic.count_diff, reverse=True)[:limit]
+        ]
+        self.snapshot = snapshot
+        self.traced = tracemalloc.get_traced_memory()[0]
+
+    def idle(self, remaining):
+        """Runs the collection that is due if its average pause fits in the remaining seconds of the frame.
+
+        Returns the seconds spent collecting.
+        """
+        if not self.tuned:
+            return 0.0
+        count = gc.get_count()
+        if count[0] < self.young:
+            return 0.0
+        generation = 2 if count[2] >= self.every else 1 if count[1] >= self.every else 0
+        while generation > 0 and self.averages[generation] > remaining:
+            generation -= 1
+        if self.averages[generation] > remaining:
+            return 0.0
+        start = time.perf_counter()
+        self.idling = True
+        try:
+            gc.collect(generation)
+        finally:
+            self.idling = False
+        return time.perf_counter() - start
+
+    def clear(self):
+        """Resets the totals, for example between benchmark scenarios."""
+        self.frames = 0
+        self.allocations = 0
+        self.max_allocations = 0
+        self.paused_frames = 0
+        self.collected = 0
+        self.collections = [0, 0, 0]
+        self.idle_collections = [0, 0, 0]
+        self.total_pause = 0.0
+        self.max_pause = 0.0
+        self.idle_pause = 0.0
+
+    def metrics(self):
+        """Returns the allocation and collection totals, with pauses in milliseconds."""
+        return {
+            "frames": self.frames,
+            "allocations per frame": round(self.allocations / max(1, self.frames), 1),
+            "max allocations": self.max_allocations,
+            "collections": list(self.collections),
+            "paused frames": self.paused_frames,
+            "pause": round(self.total_pause * 1000, 3),
+            "max pause": round(self.max_pause * 1000, 3),
+            "idle collections": list(self.idle_collections),
+            "idle pause": round(self.idle_pause * 1000, 3),
+            "collected": self.collected,
+            "frozen": gc.get_freeze_count(),
+        }
@@ -0,0 +1,96 @@
+import pygame
+
+
+enabled = True
+"""Set to False to fall back to brute-force collision checks against every sprite in a group."""
+
+
+class HashedGroup(pygame.sprite.Group):
+    """A sprite group that indexes its sprites in a uniform-grid spatial hash for collision queries.
+
+    Sprites are inserted and removed from the grid as they join and leave the group. Movement is picked up
+    once per frame by refresh(); sprites that move after the refresh and are queried in the same frame
+    must call relocate() to keep results identical to a brute-force check.
+    """
+    def __init__(self, *sprites, cell=128):
+        self.cell = cell
+        self.cells = {}
+        self.spans = {}
+        self.order = {}
+        self.counter = 0
+        super().__init__(*sprites)
+
+    def span(self, rect):
+        """Returns the range of grid cells (left, top, right, bottom) covered by a rect."""
+        cell = self.cell
+        return rect.left // cell, rect.top // cell, (rect.right - 1) // cell, (rect.bottom - 1) // cell
+
+    def insert(self, sprite, span):
+        """Adds a sprite to every cell in the span."""
+        cells = self.cells
+        for x in range(span[0], span[2] + 1):
+            for y in range(span[1], span[3] + 1):
+                bucket = cells.get((x, y))
+                if bucket is None:
+                    cells[(x, y)] = [sprite]
+                else:
+                    bucket.append(sprite)
+        self.spans[sprite] = span
+
+    def remove_cells(self, sprite):
+        """Removes a sprite from every cell it was inserted into."""
+        span = self.spans.pop(sprite)
+        cells = self.cells
+        for x in range(span[0], span[2] + 1):
+            for y in range(span[1], span[3] + 1):
+                bucket = cells[(x, y)]
+                bucket.remove(sprite)
+                if not bucket:
+                    del cells[(x, y)]
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.order[sprite] = self.counter
+        self.counter += 1
+        self.insert(sprite, self.span(sprite.rect))
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        del self.order[sprite]
+        self.remove_cells(sprite)
+
+    def relocate(self, sprite):
+        """Moves a sprite to the cells covered by its current rect."""
+        span = self.span(sprite.rect)
+        if span != self.spans[sprite]:
+            self.remove_cells(sprite)
+            self.insert(sprite, span)
+
+    def refresh(self):
+        """Updates the cells of every sprite that moved since the last refresh."""
+        for sprite in self.spritedict:
+            self.relocate(sprite)
+
+    def collide(self, sprite):
+        """Returns the sprites colliding with a sprite, in the same order as pygame.sprite.spritecollide."""
+        rect = sprite.rect
+        left, top, right, bottom = self.span(rect)
+        cells = self.cells
+        if left == right and top == bottom:
+            candidates = cells.get((left, top), ())
+        else:
+            candidates = set()
+            for x in range(left, right + 1):
+                for y in range(top, bottom + 1):
+                    candidates.update(cells.get((x, y), ()))
+        collides = [other for other in candidates if rect.colliderect(other.rect)]
+        if len(collides) > 1:
+            collides.sort(key=self.order.__getitem__)
+        return collides
+
+
+def spritecollide(sprite, group):
+    """Finds sprites in a group that intersect a sprite, using the spatial hash when available."""
+    if enabled and isinstance(group, HashedGroup):
+        return group.collide(sprite)
+    return pygame.sprite.spritecollide(sprite, group, False)
@@ -26,3 +26,81 @@ class Controller:
         """Triggers a controller rumble with specified frequency and duration."""
         if self.controller:
             self.controller.rumble(low_frequency, high_frequency, duration)
+
+
+class InputState:
+    """A snapshot of the player input for a single frame."""
+    def __init__(self, up=False, down=False, left=False, right=False, axis_x=0, axis_y=0,
+                 laser=False, rocket=False, quit=False, overlay=False):
+        self.up = up
+        self.down = down
+        self.left = left
+        self.right = right
+        self.axis_x = axis_x
+        self.axis_y = axis_y
+        self.laser = laser
+        self.rocket = rocket
+        self.quit = quit
+        self.overlay = overlay
+
+
+class LiveInput:
+    """An input source that reads the pygame event queue, the keyboard and a connected game controller."""
+    def __init__(self, controller=None):
+        self.controller = controller
+        self.state = InputState()
+
+    def timestep(self, dt):
+        """Returns the dt of the next frame."""
+        return dt
+
+    def poll(self):
+        """Reads the input for the current frame."""
+        state = InputState()
+        for event in pygame.event.get():
+            if event.type in (pygame.QUIT, pygame.WINDOWCLOSE):
+                state.quit = True
+            elif event.type == pygame.JOYBUTTONDOWN:
+                if event.button == 0:
+                    state.laser = True
+                elif event.button == 1:
+                    state.rocket = True
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    state.laser = True
+                elif event.key == pygame.K_r:
+                    state.rocket = True
+                elif event.key == pygame.K_F3:
+                    state.overlay = True
+
+        keys = pygame.key.get_pressed()
+        state.up = keys[pygame.K_w]
+        state.down = keys[pygame.K_s]
+        state.left = keys[pygame.K_a]
+        state.right = keys[pygame.K_d]
+
+        if self.controller:
+            state.axis_x = self.controller.get_axis(0)
+            state.axis_y = self.controller.get_axis(1)
+
+        self.state = state
+        return state
+
+
+class ScriptedInput:
+    """An input source that generates the input for each frame from a script function."""
+    def __init__(self, script):
+        self.script = script
+        self.frame = 0
+        self.state = InputState()
+
+    def timestep(self, dt):
+        """Returns the dt of the next frame."""
+        return dt
+
+    def poll(self):
+        """Runs the script for the current frame."""
+        pygame.event.pump()
+        self.state = self.script(self.frame)
+        self.frame += 1
+        return self.state
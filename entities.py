@@ -1,49 +1,80 @@
 import particles
+import controllers
 import sounds
-import random
+import numpy as np
 import pygame
+import collisions
+import scheduler
+import rng
+import weakref
 
 
-audio = sounds.Audio.get_instance()
+sound_effects = {
+    "laser": "assets/laser.mp3",
+    "rocket": "assets/rocket.mp3",
+    "explosion": "assets/explosion.mp3",
+    "dead": "assets/dead.mp3",
+    "heal": "assets/heal.mp3",
+    "damage": "assets/damage.mp3",
+}
 
-audio.load_sfx("laser", "assets/laser.mp3")
-audio.load_sfx("rocket", "assets/rocket.mp3")
-audio.load_sfx("explosion", "assets/explosion.mp3")
-audio.load_sfx("dead", "assets/dead.mp3")
-audio.load_sfx("heal", "assets/heal.mp3")
-audio.load_sfx("damage", "assets/damage.mp3")
+voices = {
+    "laser": {"priority": 0, "voices": 6, "interval": 0.03},
+    "damage": {"priority": 1, "voices": 4, "interval": 0.05},
+    "explosion": {"priority": 2, "voices": 4, "interval": 0.05},
+    "rocket": {"priority": 2, "voices": 2, "interval": 0.0},
+    "heal": {"priority": 3, "voices": 2, "interval": 0.0},
+    "dead": {"priority": 4, "voices": 1, "interval": 0.0},
+}
+
+
+def audio():
+    """Returns the shared audio instance, initializing the mixer on first use."""
+    return sounds.Audio.get_instance()
+
+
+def clock():
+    """Returns the shared scheduler that keeps simulation time."""
+    return scheduler.Scheduler.get_instance()
 
 
 class Cooldown:
-    """Cooldown for periodic events."""
+    """Cooldown for periodic events, kept as the simulation time it ends at so it needs no per-frame update."""
     def __init__(self, time):
         self.cooldown = time
-        self.timer = 0
+        self.until = clock().time
 
     @property
     def ready(self):
         """Checks if the cooldown period has elapsed."""
-        return self.timer <= 0
+        return clock().time >= self.until
+
+    @property
+    def timer(self):
+        """Time left until the cooldown period has elapsed."""
+        return max(0, self.until - clock().time)
+
+    @timer.setter
+    def timer(self, value):
+        self.until = clock().time + value
 
     def reset(self):
         """Resets the cooldown timer to the initial time."""
         self.timer = self.cooldown
 
-    def update(self, dt):
-        """Updates the cooldown timer."""
-        if self.timer > 0:
-            self.timer -= dt
-
 
-class Entity(pygame.sprite.Sprite):
+class Entity(particles.Movable, pygame.sprite.Sprite):
     """A base class for a rudimentary game entity."""
     group = pygame.sprite.Group()
+    healthbar_colors = ((239, 68, 68), (34, 197, 94))
+    scaled_images = weakref.WeakKeyDictionary()
 
     def __init__(self, surface, position, speed, width, height, color, health, image=None):
         super().__init__()
         if image:
             self.image = image
-            self.image = pygame.transform.scale(self.image, (width, height))
+            if self.image.get_size() != (width, height):
+                self.image = pygame.transform.scale(self.image, (width, height))
         else:
             self.image = pygame.Surface((width, height))
             self.image.fill(color)
@@ -58,7 +89,10 @@ class Entity(pygame.sprite.Sprite):
         self.color = color
         self.health = health
         self.max_health = health
+        self.damage_taken = 0
 
+        self.position = pygame.Vector2(self.rect.center)
+        self.previous = pygame.Vector2(self.rect.center)
         self.velocity = pygame.Vector2(0, 0)
 
         Entity.group.add(self)
@@ -68,13 +102,21 @@ class Entity(pygame.sprite.Sprite):
         """Checks if the viewport and buffer area contains the entity."""
         return self.buffer.contains(self.rect)
 
-    def move(self):
-        """Moves the entity based on its velocity."""
-        self.rect.move_ip(self.velocity)
+    def scaled(self, scale):
+        """Returns the image of the entity at a render scale, scaled once and shared by entities with the same image."""
+        if scale == 1:
+            return self.image
+        scales = Entity.scaled_images.setdefault(self.image, {})
+        image = scales.get(scale)
+        if image is None:
+            width, height = self.image.get_size()
+            image = pygame.transform.scale(self.image, (max(1, round(width * scale)), max(1, round(height * scale))))
+            scales[scale] = image
+        return image
 
     def collide(self, other):
         """Checks for collisions with another group of sprites."""
-        collides = pygame.sprite.spritecollide(self, other, False)
+        collides = collisions.spritecollide(self, other)
         if collides:
             self.on_collide(collides)
 
@@ -84,7 +126,7 @@ class Entity(pygame.sprite.Sprite):
 
     def destroy(self):
         """Destroys the entity with a particle burst effect."""
-        audio.play_sfx("explosion")
+        audio().play_sfx("explosion")
         particles.Burst.create(
             surface=self.surface,
             position=self.rect.center,
@@ -94,7 +136,7 @@ class Entity(pygame.sprite.Sprite):
 
     def take_damage(self, damage):
         """Reduces the health of the entity by a specified amount and triggers destruction."""
-        audio.play_sfx("damage")
+        audio().play_sfx("damage")
         particles.Burst.create(
             surface=self.surface,
             position=self.rect.center,
@@ -102,29 +144,27 @@ class Entity(pygame.sprite.Sprite):
             color=self.color,
         )
         self.health -= damage
+        self.damage_taken += damage
         if self.health <= 0:
             self.destroy()
 
     def heal(self, health):
         """Restores health of the entity by a specified amount."""
-        audio.play_sfx("heal")
+        audio().play_sfx("heal")
         self.health += health
         if self.health > self.max_health:
             self.health = self.max_health
 
-    def healthbar(self):
-        """Draws a health bar below the entity if health is not full."""
+    def healthbar(self, alpha=1.0):
+        """Returns the background and filled rects of a health bar below the entity, or None if health is full."""
         if self.health < self.max_health:
-            pygame.draw.rect(
-                self.surface,
-                (239, 68, 68),
-                (self.rect.x, self.rect.bottom + 5, self.rect.width, 5),
-            )
-            pygame.draw.rect(
-                self.surface,
-                (34, 197, 94),
-                (self.rect.x, self.rect.bottom + 5, self.rect.width * (self.health / self.max_health), 5),
+            x, y = self.interpolate(alpha) if alpha < 1 else self.rect.topleft
+            top = y + self.rect.height + 5
+            return (
+                (x, top, self.rect.width, 5),
+                (x, top, self.rect.width * (self.health / self.max_health), 5),
             )
+        return None
 
     def update(self, dt):
         """Updates the state of the entity. Override in subclass."""
@@ -133,12 +173,14 @@ class Entity(pygame.sprite.Sprite):
 
 class Player(Entity):
     """A class for the player."""
-    group = pygame.sprite.Group()
+    group = collisions.HashedGroup()
 
-    def __init__(self, surface, position, speed, width, height, color, health, image=None, controller=None):
+    def __init__(self, surface, position, speed, width, height, color, health, image=None, controller=None,
+                 controls=None):
         super().__init__(surface, position, speed, width, height, color, health, image)
         self.other = Enemy.group
         self.controller = controller
+        self.controls = controls if controls is not None else controllers.LiveInput(controller)
 
         self.acceleration = 0.05 * speed
         self.friction = 0.05
@@ -150,44 +192,46 @@ class Player(Entity):
 
         Player.group.add(self)
 
-    def move(self):
-        """Handles player movement for both keyboard and controller."""
-        super().move()
-        self.rect.clamp_ip(self.viewport)
-
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_w]:
-            self.velocity.y -= self.acceleration
-        if keys[pygame.K_s]:
-            self.velocity.y += self.acceleration
-        if keys[pygame.K_a]:
-            self.velocity.x -= self.acceleration
-        if keys[pygame.K_d]:
-            self.velocity.x += self.acceleration
-
-        if self.controller:
-            axis_x = self.controller.get_axis(0)
-            axis_y = self.controller.get_axis(1)
-            self.velocity.x += axis_x * self.acceleration
-            self.velocity.y += axis_y * self.acceleration
-
-        axis_x, axis_y = 0, 0
-
-        if not (keys[pygame.K_w] or keys[pygame.K_s] or abs(axis_y)):
-            self.velocity.y *= (1 - self.friction)
-        if not (keys[pygame.K_a] or keys[pygame.K_d] or abs(axis_x)):
-            self.velocity.x *= (1 - self.friction)
+    def move(self, dt):
+        """Handles player movement from the keyboard and controller state of the input source."""
+        super().move(dt)
+        if not self.viewport.contains(self.rect):
+            self.rect.clamp_ip(self.viewport)
+            self.position.update(self.rect.center)
+
+        scale = dt / particles.reference
+        acceleration = self.acceleration * scale
+        state = self.controls.state
+        if state.up:
+            self.velocity.y -= acceleration
+        if state.down:
+            self.velocity.y += acceleration
+        if state.left:
+            self.velocity.x -= acceleration
+        if state.right:
+            self.velocity.x += acceleration
+
+        self.velocity.x += state.axis_x * acceleration
+        self.velocity.y += state.axis_y * acceleration
+
+        friction = (1 - self.friction) ** scale
+        if not (state.up or state.down):
+            self.velocity.y *= friction
+        if not (state.left or state.right):
+            self.velocity.x *= friction
 
         if self.velocity.length() > self.speed:
             self.velocity.scale_to_length(self.speed)
 
+        Player.group.relocate(self)
+
     def laser(self):
         """Fires a laser if the cooldown has elapsed."""
         if self.cooldown.get("laser").ready:
-            audio.play_sfx("laser")
+            audio().play_sfx("laser")
             if self.controller:
                 self.controller.rumble()
-            particles.Laser(
+            particles.Laser.acquire(
                 surface=self.surface,
                 position=self.rect.center,
                 velocity=(25, 0),
@@ -201,10 +245,10 @@ class Player(Entity):
     def rocket(self):
         """Fires a rocket if the cooldown has elapsed."""
         if self.cooldown.get("rocket").ready:
-            audio.play_sfx("rocket")
+            audio().play_sfx("rocket")
             if self.controller:
                 self.controller.rumble()
-            particles.Rocket(
+            particles.Rocket.acquire(
                 surface=self.surface,
                 position=self.rect.center,
                 velocity=(25, 0),
@@ -217,64 +261,221 @@ class Player(Entity):
 
     def destroy(self):
         super().destroy()
-        audio.play_sfx("dead")
+        audio().play_sfx("dead")
 
     def update(self, dt):
         """Updates the state of the player."""
-        self.move()
-        self.healthbar()
-        self.cooldown.get("laser").update(dt)
-        self.cooldown.get("rocket").update(dt)
+        self.move(dt)
 
 
 class Enemy(Entity):
-    """A class for enemies."""
-    group = pygame.sprite.Group()
+    """A class for enemies. Enemies are handles into the arrays of the shared EnemyManager."""
+    group = collisions.HashedGroup()
+    manager = None
+    destroyed = 0
 
-    def __init__(self, surface, position, speed, width, height, color, health, damage, image=None):
+    def __init__(self, surface, position, speed, width, height, color, health, damage, image=None, kind=0):
+        self.index = Enemy.manager.add(self)
         super().__init__(surface, position, speed, width, height, color, health, image)
         self.damage = damage
         self.other = Player.group
 
         self.velocity.x -= speed
-        self.cooldown = {
-            "laser": Cooldown(random.randint(1, 3)),
-        }
+        Enemy.manager.place(self, kind=kind)
+        self.fire = clock().schedule(0, self.laser)
 
         Enemy.group.add(self)
 
+    @property
+    def health(self):
+        return Enemy.manager.health[self.index].item()
+
+    @health.setter
+    def health(self, value):
+        Enemy.manager.health[self.index] = value
+
+    @property
+    def damage(self):
+        return Enemy.manager.damage[self.index].item()
+
+    @damage.setter
+    def damage(self, value):
+        Enemy.manager.damage[self.index] = value
+
+    @property
+    def timer(self):
+        """Time left until the enemy fires its next laser."""
+        return max(0, self.fire.time - clock().time) if self.fire.active else float("inf")
+
+    @timer.setter
+    def timer(self, value):
+        clock().cancel(self.fire)
+        self.fire = clock().schedule(value, self.laser)
+
+    def move_to(self, position):
+        """Moves the enemy so that it is centered on a position."""
+        self.rect.center = position
+        Enemy.manager.place(self)
+
+    def interpolate(self, alpha):
+        x, y = Enemy.manager.interpolate(self.index, alpha)
+        return round(x), round(y)
+
     def on_collide(self, collides):
         """Handles actions upon collision."""
         for other in collides:
             other.take_damage(self.damage)
         self.destroy()
 
+    def destroy(self):
+        """Destroys the enemy and counts it towards the destroyed total."""
+        super().destroy()
+        Enemy.destroyed += 1
+
+    def kill(self):
+        """Removes the enemy from all groups, frees its slot in the manager and cancels its next laser."""
+        if self.index is not None:
+            Enemy.manager.remove(self)
+        clock().cancel(self.fire)
+        super().kill()
+
     def laser(self):
-        """Fires a laser if the cooldown has elapsed."""
-        if self.cooldown.get("laser").ready:
-            audio.play_sfx("laser")
-            particles.Laser(
-                surface=self.surface,
-                position=self.rect.center,
-                velocity=(-25, 0),
-                width=50, height=5,
-                color=self.color,
-                other=self.other,
-                damage=self.damage,
-            )
-            self.cooldown.get("laser").cooldown = random.randint(1, 3)
-            self.cooldown.get("laser").reset()
+        """Fires a laser and schedules the next one after a new random cooldown."""
+        audio().play_sfx("laser")
+        particles.Laser.acquire(
+            surface=self.surface,
+            position=self.rect.center,
+            velocity=(-25, 0),
+            width=50, height=5,
+            color=self.color,
+            other=self.other,
+            damage=self.damage,
+        )
+        self.timer = rng.random.randint(1, 3)
+
+
+class EnemyManager:
+    """Stores the state of every enemy in packed arrays and advances all enemies in batched operations.
+
+    Movement, collisions with the player and the buffer visibility check are array operations; only enemies
+    that collide or leave the buffer run Python code, and lasers are fired by the scheduler. Enemy sprites are
+    handles that keep the Rect used for drawing and collision queries and read their health and damage from
+    the arrays. Removing an enemy moves the last enemy into its slot.
+    """
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.capacity = 0
+        self.handles = []
+
+        self.position = np.zeros((0, 2))
+        self.previous = np.zeros((0, 2))
+        self.velocity = np.zeros((0, 2))
+        self.size = np.zeros((0, 2), dtype=np.int64)
+        self.health = np.zeros(0)
+        self.damage = np.zeros(0, dtype=np.int64)
+        self.kind = np.zeros(0, dtype=np.intp)
+
+        self.allocate(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def allocate(self, capacity):
+        """Grows the enemy arrays to hold the specified number of enemies."""
+        for name in ("position", "previous", "velocity", "size", "health", "damage", "kind"):
+            array = getattr(self, name)
+            resized = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            resized[:self.count] = array[:self.count]
+            setattr(self, name, resized)
+        self.capacity = capacity
+
+    def add(self, enemy):
+        """Reserves a cleared slot for an enemy and returns its index."""
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+        index = self.count
+        for array in (self.position, self.previous, self.velocity, self.size, self.health, self.damage, self.kind):
+            array[index] = 0
+        self.handles.append(enemy)
+        self.count += 1
+        return index
+
+    def place(self, enemy, kind=None):
+        """Copies the rect and velocity of an enemy into its slot."""
+        index = enemy.index
+        self.position[index] = enemy.rect.topleft
+        self.previous[index] = enemy.rect.topleft
+        self.size[index] = enemy.rect.size
+        self.velocity[index] = enemy.velocity
+        if kind is not None:
+            self.kind[index] = kind
+
+    def remove(self, enemy):
+        """Frees the slot of an enemy by moving the last enemy into it."""
+        index = enemy.index
+        last = self.count - 1
+        if index != last:
+            for array in (self.position, self.previous, self.velocity, self.size, self.health, self.damage, self.kind):
+                array[index] = array[last]
+            moved = self.handles[last]
+            self.handles[index] = moved
+            moved.index = index
+        self.handles.pop()
+        self.count = last
+        enemy.index = None
+
+    def interpolate(self, index, alpha):
+        """Returns the top left corner of an enemy, interpolated between its last two ticks."""
+        previous = self.previous[index]
+        return (previous + (self.position[index] - previous) * alpha).tolist()
+
+    def clear(self):
+        """Detaches every enemy from the arrays."""
+        for enemy in self.handles:
+            enemy.index = None
+        self.handles = []
+        self.count = 0
 
     def update(self, dt):
-        """Updates the state of the enemy."""
-        self.move()
-        self.collide(self.other)
-        self.healthbar()
-
-        self.cooldown.get("laser").update(dt)
-        self.laser()
-
-        if not self.visible:
-            for other in self.other:
-                other.take_damage(self.damage)
-            self.kill()
+        """Moves every enemy scaled to dt, then resolves collisions with the player and removes escaped enemies."""
+        n = self.count
+        if n == 0:
+            return
+
+        position = self.position[:n]
+        self.previous[:n] = position
+        position += self.velocity[:n] * (dt / particles.reference)
+        rounded = np.round(position).astype(np.int64)
+        for enemy, topleft in zip(self.handles, rounded.tolist()):
+            enemy.rect.topleft = topleft
+
+        size = self.size[:n]
+        left, top = rounded[:, 0], rounded[:, 1]
+        right, bottom = left + size[:, 0], top + size[:, 1]
+
+        collides = {}
+        for player in Player.group.sprites():
+            rect = player.rect
+            hit = (left < rect.right) & (right > rect.left) & (top < rect.bottom) & (bottom > rect.top)
+            for index in np.flatnonzero(hit).tolist():
+                collides.setdefault(self.handles[index], []).append(player)
+
+        viewport = self.handles[0].viewport
+        escaped = ~(
+            (left >= viewport.left - size[:, 0]) & (top >= viewport.top - size[:, 1])
+            & (right <= viewport.right + size[:, 0]) & (bottom <= viewport.bottom + size[:, 1])
+        )
+        escaped = [self.handles[index] for index in np.flatnonzero(escaped).tolist()]
+
+        for enemy, players in collides.items():
+            players = [player for player in players if player.alive()]
+            if players and enemy.alive():
+                enemy.on_collide(players)
+        for enemy in escaped:
+            if enemy.alive():
+                for other in enemy.other:
+                    other.take_damage(enemy.damage)
+                enemy.kill()
+
+
+Enemy.manager = EnemyManager()
@@ -0,0 +1,354 @@
+import particles
+import background
+import entities
+import spawners
+import assets
+import sounds
+import profiler
+import governor
+import renderers
+import scheduler
+import concurrent.futures
+import time
+import pygame
+
+
+profile = profiler.Profiler.get_instance()
+
+images = [
+    "assets/player.png",
+    "assets/enemy_red.png",
+    "assets/enemy_yellow.png",
+    "assets/enemy_green.png",
+]
+
+
+def load_assets():
+    """Starts decoding every image and sound effect in the background."""
+    assets.Assets.get_instance().preload(images)
+    audio = sounds.Audio.get_instance()
+    for name, path in entities.sound_effects.items():
+        audio.preload_sfx(name, path)
+    for name, config in entities.voices.items():
+        audio.voices.configure(name, **config)
+
+
+class Game:
+    """The game world and the steps of the main loop, shared by the windowed and headless entry points."""
+    def __init__(self, surface, controls, controller=None, stars=100):
+        self.surface = surface
+        self.viewport = surface.get_rect()
+        self.controls = controls
+        self.running = True
+        self.frame = 0
+        self.snapshot = Snapshot()
+
+        Game.reset()
+
+        self.starfield = background.Starfield(surface, stars=stars)
+
+        self.player = entities.Player(
+            surface=surface,
+            position=(self.viewport.width // 10, self.viewport.height // 2),
+            speed=15,
+            width=64, height=64,
+            color=(59, 130, 246),
+            health=100,
+            image=assets.Assets.get_instance().image("assets/player.png", (64, 64)),
+            controller=controller,
+            controls=controls,
+        )
+        self.enemies = spawners.EnemySpawner(
+            surface=surface,
+            interval=5,
+            delta=0.2,
+            minimum=3,
+        )
+        self.health = spawners.HealthSpawner(
+            surface=surface,
+            interval=15,
+            delta=0,
+            minimum=0,
+        )
+
+    @staticmethod
+    def reset():
+        """Removes all particles and entities left over from a previous game."""
+        for sprite in particles.Particle.group.sprites():
+            sprite.kill()
+        entities.Entity.group.empty()
+        entities.Player.group.empty()
+        entities.Enemy.group.empty()
+        entities.Enemy.manager.clear()
+        entities.Enemy.destroyed = 0
+        scheduler.Scheduler.get_instance().clear()
+        particles.Burst.system.clear()
+
+    def handle_input(self):
+        """Acts on the polled input: quits, toggles the overlay and fires the player's weapons."""
+        state = self.controls.state
+        if state.quit:
+            self.running = False
+        if state.overlay:
+            profile.toggle()
+        if self.player.alive():
+            if state.laser:
+                self.player.laser()
+            if state.rocket:
+                self.player.rocket()
+
+    def poll(self, dt):
+        """Reads the input for the next tick and returns its dt, which the input source may replace during replays.
+
+        Input must be polled on the main thread, as pygame only receives events there.
+        """
+        dt = self.controls.timestep(dt)
+        with profile.scope("input"):
+            self.controls.poll()
+        return dt
+
+    def update(self, dt):
+        """Polls the input and advances the simulation by one tick."""
+        self.step(self.poll(dt))
+
+    def step(self, dt, state=None, quality=None):
+        """Advances the simulation by one tick, using the input and quality polled earlier if they are passed."""
+        if state is not None:
+            self.controls.state = state
+        if quality is not None:
+            governor.Governor.get_instance().quality = quality
+        self.handle_input()
+
+        with profile.scope("scheduler.advance"):
+            scheduler.Scheduler.get_instance().advance(dt)
+
+        with profile.scope("Starfield.update"):
+            self.starfield.update(dt)
+
+        with profile.scope("collisions.refresh"):
+            entities.Enemy.group.refresh()
+            entities.Player.group.refresh()
+
+        with profile.scope("Particle.group.update"):
+            profile.update_group(particles.Particle.group, dt)
+        with profile.scope("Burst.system.update"):
+            particles.Burst.system.update(dt)
+        with profile.scope("Player.group.update"):
+            profile.update_group(entities.Player.group, dt)
+        with profile.scope("Enemy.manager.update"):
+            entities.Enemy.manager.update(dt)
+
+        profile.count("particles", len(particles.Particle.group))
+        profile.count("bursts", len(particles.Burst.system))
+        profile.count("enemies", len(entities.Enemy.group))
+        profile.count("timers", len(scheduler.Scheduler.get_instance()))
+        if profile.enabled:
+            for key, value in sounds.Audio.get_instance().voices.totals().items():
+                profile.count(f"sfx {key}", value)
+            for key, value in governor.Governor.get_instance().metrics(len(self.starfield.layers)).items():
+                profile.count(key, value)
+
+        self.frame += 1
+
+    def capture(self, snapshot, alpha=1.0, dirty=False, scale=1.0):
+        """Captures what is needed to draw the current tick into a snapshot, with star rects if dirty is set."""
+        with profile.scope("capture"):
+            snapshot.scale = scale
+            self.starfield.blits(snapshot.stars, alpha, scale)
+            snapshot.star_rects = self.starfield.rects(alpha) if dirty else None
+            snapshot.bursts = particles.Burst.system.blits(alpha, scale)
+            snapshot.particles.fill(particles.Particle.group.spritedict, alpha, scale)
+            snapshot.entities.fill(entities.Entity.group.spritedict, alpha, scale)
+            if governor.Governor.get_instance().healthbars:
+                healthbars = (entity.healthbar(alpha) for entity in entities.Entity.group.spritedict)
+                healthbars = [healthbar for healthbar in healthbars if healthbar]
+                if scale != 1:
+                    healthbars = [
+                        tuple(tuple(round(value * scale) for value in rect) for rect in healthbar)
+                        for healthbar in healthbars
+                    ]
+                snapshot.healthbars = healthbars
+            else:
+                snapshot.healthbars = []
+
+    def draw(self, clear=True, dirty=None, alpha=1.0, snapshot=None, canvas=None):
+        """Draws the current frame onto the surface. If a dirty list is passed, the areas drawn are appended to it.
+
+        A snapshot captured earlier is drawn instead of the current tick if passed. If a canvas is passed, the
+        snapshot is drawn onto it and upscaled to the surface, and only the overlay is drawn at full resolution.
+        """
+        if snapshot is None:
+            snapshot = self.snapshot
+            self.capture(snapshot, alpha, dirty is not None)
+
+        target = self.surface if canvas is None else canvas
+        if clear:
+            with profile.scope("fill"):
+                target.fill((0, 0, 0))
+
+        snapshot.draw(target, dirty)
+        if canvas is not None:
+            with profile.scope("upscale"):
+                pygame.transform.scale(canvas, self.viewport.size, self.surface)
+        overlay = profile.draw(self.surface)
+        if dirty is not None and overlay:
+            dirty.append(overlay)
+
+
+class Snapshot:
+    """The draw calls of one tick, captured so they can be drawn while the simulation moves on to the next.
+
+    Images are shared with the sprites and positions are copied, so each snapshot only owns its sequences.
+    """
+    def __init__(self):
+        self.scale = 1.0
+        self.stars = []
+        self.star_rects = None
+        self.bursts = ([], [], None)
+        self.particles = renderers.BlitBatch()
+        self.entities = renderers.BlitBatch()
+        self.healthbars = []
+
+    def draw(self, surface, dirty=None):
+        """Draws the captured tick in layer order. If a dirty list is passed, the areas drawn are appended to it."""
+        with profile.scope("Starfield.draw"):
+            surface.blits(self.stars, doreturn=False)
+        with profile.scope("Burst.system.draw"):
+            frames, positions, rects = self.bursts
+            surface.blits(zip(frames, positions), doreturn=False)
+        with profile.scope("Particle.group.draw"):
+            self.particles.draw(surface, dirty)
+        with profile.scope("Entity.group.draw"):
+            self.entities.draw(surface, dirty)
+            background, filled = entities.Entity.healthbar_colors
+            for area, health in self.healthbars:
+                pygame.draw.rect(surface, background, area)
+                pygame.draw.rect(surface, filled, health)
+
+        if dirty is not None:
+            if self.star_rects is not None:
+                dirty.extend(self.star_rects)
+            if rects is not None:
+                dirty.extend(rects)
+            dirty.extend(area for area, _ in self.healthbars)
+
+
+class FixedStep:
+    """Runs the simulation at a constant tick rate and renders interpolated frames as often as the machine sustains."""
+    def __init__(self, world, renderer, rate=60, max_ticks=5, max_skip=5):
+        self.world = world
+        self.renderer = renderer
+        self.tick = 1 / rate
+        self.max_ticks = max_ticks
+        self.max_skip = max_skip
+        self.accumulator = 0.0
+        self.skipping = 0
+
+        self.ticks = 0
+        self.frames = 0
+        self.skipped = 0
+        self.dropped = 0.0
+
+        self.window = (time.perf_counter(), 0, 0)
+        self.tps = 0.0
+        self.fps = 0.0
+
+    def advance(self, elapsed):
+        """Runs the ticks due after elapsed seconds of real time, then renders a frame unless it is skipped."""
+        self.accumulator += elapsed
+        ticks = 0
+        while self.accumulator >= self.tick and ticks < self.max_ticks and self.world.running:
+            self.world.update(self.tick)
+            self.accumulator -= self.tick
+            ticks += 1
+        self.ticks += ticks
+
+        if self.pace():
+            self.renderer.render(alpha=self.accumulator / self.tick)
+            self.frames += 1
+
+        self.measure()
+
+    def pace(self):
+        """Returns whether to render, skipping up to max_skip frames in a row while behind, then dropping the rest."""
+        behind = self.accumulator >= self.tick
+        if behind and self.skipping < self.max_skip:
+            self.skipping += 1
+            self.skipped += 1
+            return False
+        if behind:
+            self.dropped += self.accumulator - self.accumulator % self.tick
+            self.accumulator %= self.tick
+        self.skipping = 0
+        return True
+
+    def measure(self):
+        """Updates the ticks and rendered frames per second about once a second."""
+        start, ticks, frames = self.window
+        now = time.perf_counter()
+        if now - start >= 1:
+            self.tps = (self.ticks - ticks) / (now - start)
+            self.fps = (self.frames - frames) / (now - start)
+            self.window = (now, self.ticks, self.frames)
+        profile.count("ticks per second", round(self.tps))
+        profile.count("frames per second", round(self.fps))
+        profile.count("skipped frames", self.skipped)
+
+    def metrics(self):
+        """Returns the tick and frame totals and the most recent rates."""
+        return {
+            "ticks": self.ticks,
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "dropped": round(self.dropped, 3),
+            "tps": round(self.tps, 1),
+            "fps": round(self.fps, 1),
+        }
+
+    def close(self):
+        """Releases the resources of the loop."""
+        pass
+
+
+class Pipeline(FixedStep):
+    """Simulates the due ticks on a worker thread while the main thread draws the last captured one.
+
+    Input is still polled on the main thread, and frames are drawn a call late and without interpolation.
+    """
+    def __init__(self, world, renderer, rate=60):
+        super().__init__(world, renderer, rate=rate)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="simulation")
+        self.snapshots = [Snapshot(), Snapshot()]
+        self.world.capture(self.snapshots[0], dirty=self.renderer.dirty, scale=self.renderer.scale)
+
+    def simulate(self, inputs, snapshot):
+        """Steps the world through the polled ticks and captures the last one into a snapshot. Runs on the worker."""
+        for dt, state, quality in inputs:
+            self.world.step(dt, state, quality)
+        self.world.capture(snapshot, dirty=self.renderer.dirty, scale=self.renderer.scale)
+
+    def advance(self, elapsed):
+        """Runs the ticks due after elapsed seconds of real time on the worker while the last capture is rendered."""
+        self.accumulator += elapsed
+        inputs = []
+        while self.accumulator >= self.tick and len(inputs) < self.max_ticks and self.world.running:
+            dt = self.world.poll(self.tick)
+            inputs.append((dt, self.world.controls.state, governor.Governor.get_instance().quality))
+            self.accumulator -= self.tick
+        render = self.pace()
+
+        front, back = self.snapshots
+        future = self.executor.submit(self.simulate, inputs, back) if inputs else None
+        if render:
+            self.renderer.render(snapshot=front)
+            self.frames += 1
+        if future is not None:
+            future.result()
+            self.snapshots.reverse()
+
+        self.ticks += len(inputs)
+        self.measure()
+
+    def close(self):
+        """Stops the worker thread."""
+        self.executor.shutdown()
@@ -0,0 +1,91 @@
+import collections
+import math
+
+
+class Governor:
+    """Scales particle effects and optional drawing to keep recent frame times within a budget.
+
+    The quality level drops quickly while the average frame time is over budget and recovers slowly once
+    there is headroom. Lower levels reduce burst counts and lifespans, then skip the far starfield layers
+    and the healthbars, and lower the resolution of the scaled renderer along the way. The hard particle cap
+    applies even when the governor is disabled.
+    """
+    instance = None
+
+    @staticmethod
+    def get_instance():
+        if Governor.instance is None:
+            Governor.instance = Governor()
+        return Governor.instance
+
+    def __init__(self, budget=1 / 60, window=30, cap=20000, minimum=0.2):
+        self.enabled = False
+        self.budget = budget
+        self.samples = collections.deque(maxlen=window)
+        self.cap = cap
+        self.minimum = minimum
+        self.quality = 1.0
+        self.capped = 0
+
+    def enable(self, budget=None):
+        """Starts adapting the quality level, optionally to a new frame-time budget in seconds."""
+        self.enabled = True
+        if budget:
+            self.budget = budget
+
+    def record(self, frame_time):
+        """Adds the time spent on a frame and adjusts the quality level."""
+        if not self.enabled:
+            return
+        self.samples.append(frame_time)
+        average = sum(self.samples) / len(self.samples)
+        if average > self.budget:
+            self.quality = max(self.minimum, self.quality * 0.9)
+        elif average < self.budget * 0.75:
+            self.quality = min(1.0, self.quality + 0.01)
+
+    def bursts(self, num, alive=0):
+        """Scales the number of particles in a burst, keeping at least one, and limits it to the particle cap."""
+        if self.quality < 1 and num > 0:
+            num = max(1, round(num * self.quality))
+        allowed = max(0, min(num, self.cap - alive))
+        self.capped += num - allowed
+        return allowed
+
+    def lifespan(self, lifespan):
+        """Scales the lifespan of burst particles, down to half at the lowest quality."""
+        if self.quality >= 1:
+            return lifespan
+        return max(1, round(lifespan * (0.5 + 0.5 * self.quality)))
+
+    def layers(self, num):
+        """Returns how many of the nearest starfield layers to draw."""
+        if self.quality >= 0.6:
+            return num
+        return max(1, round(num * self.quality / 0.6))
+
+    def resolution(self, minimum=0.5, step=0.1):
+        """Returns the render scale for the quality level, from 1 at full quality down to the minimum at the lowest.
+
+        The scale is rounded down to a multiple of the step, so it only takes a few distinct values.
+        """
+        if self.quality >= 1:
+            return 1.0
+        scale = minimum + (1 - minimum) * (self.quality - self.minimum) / (1 - self.minimum)
+        return max(minimum, round(math.floor(scale / step + 1e-9) * step, 6))
+
+    @property
+    def healthbars(self):
+        """Checks if healthbars should be drawn."""
+        return self.quality >= 0.4
+
+    def metrics(self, layers=3):
+        """Returns the quality level and which degradations are active, for a starfield of that many layers."""
+        return {
+            "quality": round(self.quality * 100),
+            "burst scale": round(100 * self.quality) if self.quality < 1 else 100,
+            "lifespan scale": round(self.lifespan(100)),
+            "starfield layers": self.layers(layers),
+            "healthbars": int(self.healthbars),
+            "capped particles": self.capped,
+        }
@@ -0,0 +1,168 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import particles
+import entities
+import controllers
+import game
+import assets
+import profiler
+import governor
+import renderers
+import replays
+import collector
+import rng
+import argparse
+import time
+import pygame
+
+
+def patrol(frame):
+    """A scripted player that sweeps up and down the screen while firing lasers and the occasional rocket."""
+    return controllers.InputState(
+        up=frame % 240 < 120,
+        down=frame % 240 >= 120,
+        laser=True,
+        rocket=frame % 300 == 0,
+    )
+
+
+def idle(frame):
+    """A scripted player that does nothing."""
+    return controllers.InputState()
+
+
+def run(frames=3600, seed=0, dt=1 / 60, script=patrol, draw=True, trace=None, renderer="full", budget=None,
+        replay=None, record=None, pipelined=False, scale=None, driver=None, policy="default"):
+    """Runs a seeded game for a number of frames at a fixed dt as fast as possible and reports throughput."""
+    profile = profiler.Profiler.get_instance()
+    if trace:
+        profile.trace()
+
+    pygame.init()
+    flags = 0 if renderers.resolve(renderer, scale).display else pygame.HIDDEN
+    window = pygame.display.set_mode((1920, 1080), flags)
+
+    game.load_assets()
+    assets.Loader.get_instance().wait()
+
+    if replay:
+        controls = replays.Replay(replay)
+        seed = controls.seed
+        frames = len(controls)
+    else:
+        controls = controllers.ScriptedInput(script)
+        if record:
+            controls = replays.Recorder(controls, seed)
+
+    rng.seed(seed)
+    world = game.Game(
+        surface=window,
+        controls=controls,
+    )
+    renderer = renderers.create(renderer, world, scale=scale, driver=driver)
+
+    quality = governor.Governor.get_instance()
+    if budget and not replay:
+        quality.enable(budget)
+
+    pipeline = game.Pipeline(world, renderer, rate=1 / dt) if pipelined and draw else None
+
+    collection = collector.Collector.get_instance()
+    if policy == "tuned":
+        collection.tune()
+    collection.enable()
+
+    start = time.perf_counter()
+    rendered = 0
+    for _ in range(frames):
+        frame_start = time.perf_counter()
+        if pipeline:
+            pipeline.advance(pipeline.tick)
+            rendered += 1
+        else:
+            world.update(dt)
+            if draw:
+                renderer.render()
+                rendered += 1
+        collection.end_frame()
+        profile.end_frame()
+        quality.record(time.perf_counter() - frame_start)
+        collection.idle(dt - (time.perf_counter() - frame_start))
+        if not world.running:
+            break
+    elapsed = time.perf_counter() - start
+    if pipeline:
+        pipeline.close()
+
+    if trace:
+        profile.export(trace)
+    if record and not replay:
+        controls.save(record)
+
+    return {
+        "seed": seed,
+        "frames": world.frame,
+        "seconds": elapsed,
+        "tps": world.frame / elapsed if elapsed else 0,
+        "fps": rendered / elapsed if elapsed else 0,
+        "player_health": world.player.health,
+        "player_alive": world.player.alive(),
+        "enemies": len(entities.Enemy.group),
+        "particles": len(particles.Particle.group),
+        "bursts": len(particles.Burst.system),
+        "assets": assets.Assets.get_instance().stats(),
+        "governor": quality.metrics(len(world.starfield.layers)),
+        "gc": collection.metrics(),
+    }
+
+
+def main():
+    """Command line entry point for headless runs."""
+    parser = argparse.ArgumentParser(description="Runs the game without a display or sound card.")
+    parser.add_argument("--frames", type=int, default=3600, help="number of frames to simulate")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the shared random generators")
+    parser.add_argument("--dt", type=float, default=1 / 60, help="fixed time step in seconds")
+    parser.add_argument("--script", choices=["patrol", "idle"], default="patrol", help="scripted input")
+    parser.add_argument("--no-draw", action="store_true", help="skip rendering and only simulate")
+    parser.add_argument("--trace", help="record a Chrome trace-event JSON file of the run")
+    parser.add_argument("--renderer", choices=renderers.renderers, default="full", help="rendering path")
+    parser.add_argument("--budget", type=float, default=0,
+                        help="frame-time budget in milliseconds for the quality governor (default: disabled)")
+    parser.add_argument("--replay", help="play back a replay file instead of the script")
+    parser.add_argument("--record", help="record the input of the run to a replay file")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="simulate each tick on a worker thread while the previous one is drawn")
+    parser.add_argument("--scale", type=float, default=0,
+                        help="fixed render resolution in percent of the window, implies the scaled renderer")
+    parser.add_argument("--driver", help="SDL render driver of the texture renderer, such as software")
+    parser.add_argument("--gc", choices=["default", "tuned"], default="default",
+                        help="garbage collection policy, tuned freezes startup objects and collects in idle time")
+    args = parser.parse_args()
+
+    report = run(
+        frames=args.frames,
+        seed=args.seed,
+        dt=args.dt,
+        script={"patrol": patrol, "idle": idle}[args.script],
+        draw=not args.no_draw,
+        trace=args.trace,
+        renderer=args.renderer,
+        budget=args.budget / 1000,
+        replay=args.replay,
+        record=args.record,
+        pipelined=args.pipelined,
+        scale=args.scale / 100,
+        driver=args.driver,
+        policy=args.gc,
+    )
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
-import particles
-import entities
-import spawners
 import controllers
 import sounds
+import assets
+import game
+import profiler
+import governor
+import renderers
+import replays
+import collector
+import rng
+import argparse
 import os
 import random
+import time
 import pygame
 
 
@@ -13,87 +20,135 @@ os.environ["SDL_JOYSTICK_HIDAPI_PS5_RUMBLE"] = "1"
 pygame.init()
 
 
-def main():
-    """Main function for the game loop."""
-    window = pygame.display.set_mode((1920, 1080))
-    viewport = window.get_rect()
+def main(trace=None, renderer="full", startup=False, budget=1 / 60, record=None, replay=None, seed=None, rate=60,
+         fps=60, pipelined=False, scale=None, driver=None, policy="tuned", allocations=False):
+    """Main function for the game loop. Press F3 to toggle the profiler overlay."""
+    start = time.perf_counter()
+
+    flags = 0 if renderers.resolve(renderer, scale).display else pygame.HIDDEN
+    window = pygame.display.set_mode((1920, 1080), flags)
     pygame.display.set_caption("Space Invaders")
 
-    audio = sounds.Audio()
+    loader = assets.Loader.get_instance()
+    game.load_assets()
+
+    audio = sounds.Audio.get_instance()
 
     audio.load_music("assets/music.mp3")
     audio.play_music()
 
     controller = controllers.Controller()
 
-    for _ in range(100):
-        particles.Star(
-            surface=window,
-            position=(random.randint(0, viewport.width), random.randint(0, viewport.height)),
-            velocity=(random.uniform(-7, -3), 0),
-            side=random.randint(1, 5),
-            color=(255, 255, 255),
-        )
-
-    player = entities.Player(
+    if replay:
+        controls = replays.Replay(replay)
+        seed = controls.seed
+    else:
+        controls = controllers.LiveInput(controller)
+        if seed is None:
+            seed = random.getrandbits(63)
+        if record:
+            controls = replays.Recorder(controls, seed)
+
+    rng.seed(seed)
+    world = game.Game(
         surface=window,
-        position=(viewport.width // 10, viewport.height // 2),
-        speed=15,
-        width=64, height=64,
-        color=(59, 130, 246),
-        health=100,
-        image=pygame.image.load("assets/player.png").convert_alpha(),
+        controls=controls,
         controller=controller,
     )
-    enemies = spawners.EnemySpawner(
-        surface=window,
-        interval=5,
-        delta=0.2,
-        minimum=3,
-    )
-    health = spawners.HealthSpawner(
-        surface=window,
-        interval=15,
-        delta=0,
-        minimum=0,
-    )
+
+    renderer = renderers.create(renderer, world, scale=scale, driver=driver)
+    step = (game.Pipeline if pipelined else game.FixedStep)(world, renderer, rate=rate)
+
+    profile = profiler.Profiler.get_instance()
+    if trace:
+        profile.trace()
+
+    collection = collector.Collector.get_instance()
+    if policy == "tuned":
+        collection.tune()
+    collection.enable()
+    if allocations:
+        collection.trace()
+
+    quality = governor.Governor.get_instance()
+    if budget and not replay:
+        quality.enable(budget)
 
     clock = pygame.time.Clock()
     dt = 0
-
-    run = True
-    while run:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-            if player.alive():
-                if event.type == pygame.JOYBUTTONDOWN:
-                    if event.button == 0:
-                        player.laser()
-                    elif event.button == 1:
-                        player.rocket()
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE:
-                        player.laser()
-                    elif event.key == pygame.K_r:
-                        player.rocket()
-
-        window.fill((0, 0, 0))
-
-        enemies.update(dt)
-        health.update(dt)
-
-        particles.Particle.group.draw(window)
-        particles.Particle.group.update(dt)
-
-        entities.Entity.group.draw(window)
-        entities.Entity.group.update(dt)
-
-        pygame.display.flip()
-        dt = clock.tick(60) / 1000
+    first_frame = None
+
+    frame_start = time.perf_counter()
+
+    while world.running:
+        step.advance(dt)
+        collection.end_frame()
+        profile.end_frame()
+        idle = collection.idle(1 / fps - (time.perf_counter() - frame_start)) if fps else 0.0
+        dt = clock.tick(fps) / 1000
+        frame_start = time.perf_counter()
+        quality.record(clock.get_rawtime() / 1000 - idle)
+
+        if first_frame is None:
+            first_frame = time.perf_counter() - start
+        if startup and loader.finished is None and loader.pending() == 0:
+            print(f"first frame after {first_frame * 1000:.0f} ms, "
+                  f"assets ready after {(loader.finished - start) * 1000:.0f} ms")
+            for key, seconds in sorted(loader.timings.items()):
+                print(f"  {key}: {seconds * 1000:.0f} ms")
+
+    step.close()
+    if startup:
+        print(", ".join(f"{key} {value}" for key, value in step.metrics().items()))
+    if startup or allocations:
+        print(", ".join(f"gc {key} {value}" for key, value in collection.metrics().items()))
+    if allocations:
+        for site, count, size in collection.sites:
+            print(f"  {site}: {count:+d} blocks, {size / 1024:+.1f} KiB")
+    if trace:
+        profile.export(trace)
+    if record and not replay:
+        controls.save(record)
 
     pygame.quit()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Space Invaders")
+    parser.add_argument("--trace", help="record a Chrome trace-event JSON file of the session")
+    parser.add_argument("--renderer", choices=renderers.renderers, default="full", help="rendering path")
+    parser.add_argument("--startup", action="store_true",
+                        help="print startup and asset loading times, and tick and frame rates on exit")
+    parser.add_argument("--budget", type=float, default=1000 / 60,
+                        help="frame-time budget in milliseconds for the quality governor, 0 to disable")
+    parser.add_argument("--record", help="record the session input to a replay file")
+    parser.add_argument("--replay", help="play back a replay file instead of live input")
+    parser.add_argument("--seed", type=int, help="seed for the shared random generators (default: random)")
+    parser.add_argument("--rate", type=int, default=60, help="simulation ticks per second")
+    parser.add_argument("--fps", type=int, default=60, help="rendered frames per second limit, 0 for no limit")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="simulate the next tick on a worker thread while the last one is drawn")
+    parser.add_argument("--scale", type=float, default=0,
+                        help="fixed render resolution in percent of the window, implies the scaled renderer")
+    parser.add_argument("--driver", help="SDL render driver of the texture renderer, such as software")
+    parser.add_argument("--gc", choices=["default", "tuned"], default="tuned",
+                        help="garbage collection policy, tuned freezes startup objects and collects in idle time")
+    parser.add_argument("--allocations", action="store_true",
+                        help="trace allocations with tracemalloc and print the top allocation sites on exit")
+    args = parser.parse_args()
+    main(
+        trace=args.trace,
+        renderer=args.renderer,
+        startup=args.startup,
+        budget=args.budget / 1000,
+        record=args.record,
+        replay=args.replay,
+        seed=args.seed,
+        rate=args.rate,
+        fps=args.fps,
+        pipelined=args.pipelined,
+        scale=args.scale / 100,
+        driver=args.driver,
+        policy=args.gc,
+        allocations=args.allocations,
+    )
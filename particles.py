@@ -1,38 +1,117 @@
 import math
-import random
+import numpy as np
 import pygame
+import collisions
+import pools
+import governor
+import rng
 
 
-class Particle(pygame.sprite.Sprite):
-    """A base class for creating particle effects."""
+reference = 1 / 60
+"""Duration in seconds of the step that velocities, accelerations and lifespans are given in."""
+
+
+class Movable:
+    """A mixin for sprites with a float position, previous position and velocity next to their rect."""
+    def move(self, dt):
+        """Moves the float position by the velocity scaled to dt and rounds it into the rect."""
+        scale = dt / reference
+        self.previous.update(self.position)
+        self.position += self.velocity if scale == 1 else self.velocity * scale
+        self.rect.center = self.position
+
+    def interpolate(self, alpha):
+        """Returns the top left corner to draw at, blended between the previous and current position."""
+        x = self.previous.x + (self.position.x - self.previous.x) * alpha
+        y = self.previous.y + (self.position.y - self.previous.y) * alpha
+        return round(x - self.rect.width / 2), round(y - self.rect.height / 2)
+
+
+class Particle(Movable, pygame.sprite.Sprite):
+    """A base class for creating particle effects.
+
+    Particles are reset in place rather than reconstructed, so classes with a pool are recycled through
+    acquire() and kill() without allocating a new Surface, Rect or Vector2. Particles are solid, so their
+    images are shared by size and color and never change once created.
+    """
     group = pygame.sprite.Group()
+    pool = None
+    images = {}
 
-    def __init__(self, surface, position, velocity, width, height, color):
+    def __init__(self, *args, **kwargs):
         super().__init__()
-        self.image = pygame.Surface((width, height))
-        self.image.fill(color)
-        self.rect = self.image.get_rect(center=position)
+        self.image = None
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.surface = None
+        self.viewport = None
+        self.buffer = pygame.Rect(0, 0, 0, 0)
+        self.position = pygame.Vector2(0, 0)
+        self.previous = pygame.Vector2(0, 0)
+        self.velocity = pygame.Vector2(0, 0)
+        self.color = None
+        if args or kwargs:
+            self.reset(*args, **kwargs)
 
-        self.surface = surface
-        self.viewport = surface.get_rect()
-        self.buffer = self.viewport.inflate(self.rect.width * 2, self.rect.height * 2)
-        self.velocity = pygame.Vector2(velocity)
+    @classmethod
+    def acquire(cls, **kwargs):
+        """Returns a particle from the class pool reset with the specified properties."""
+        if cls.pool is None:
+            return cls(**kwargs)
+        return cls.pool.acquire(**kwargs)
+
+    @staticmethod
+    def solid(size, color, scale=1.0):
+        """Returns the shared image of a particle of a size and color, optionally scaled."""
+        key = (size, color, scale)
+        image = Particle.images.get(key)
+        if image is None:
+            width, height = size
+            image = pygame.Surface((max(1, round(width * scale)), max(1, round(height * scale))))
+            image.fill(color)
+            Particle.images[key] = image
+        return image
+
+    def reset(self, surface, position, velocity, width, height, color):
+        """Resets the particle in place so it can be reused."""
+        color = tuple(color)
+        if self.image is None or self.color != color or self.rect.size != (width, height):
+            self.image = Particle.solid((width, height), color)
+        self.rect.size = (width, height)
+        self.rect.center = position
+        self.position.update(position)
+        self.previous.update(position)
+
+        if surface is not self.surface:
+            self.surface = surface
+            self.viewport = surface.get_rect()
+        self.buffer.update(self.viewport)
+        self.buffer.inflate_ip(width * 2, height * 2)
+        self.velocity.update(velocity)
         self.color = color
 
         Particle.group.add(self)
 
+    def kill(self):
+        """Removes the particle from all groups and returns it to its pool."""
+        pooled = self.pool is not None and self.alive()
+        super().kill()
+        if pooled:
+            self.pool.release(self)
+
     @property
     def visible(self):
         """Checks if the viewport and buffer area contains the particle."""
         return self.buffer.contains(self.rect)
 
-    def move(self):
-        """Moves the particle based on its velocity."""
-        self.rect.move_ip(self.velocity)
+    def scaled(self, scale):
+        """Returns the image of the particle at a render scale."""
+        if scale == 1:
+            return self.image
+        return Particle.solid(self.rect.size, self.color, scale)
 
     def collide(self, other):
         """Checks for collisions with another group of sprites."""
-        collides = pygame.sprite.spritecollide(self, other, False)
+        collides = collisions.spritecollide(self, other)
         if collides:
             self.on_collide(collides)
 
@@ -45,73 +124,234 @@ class Particle(pygame.sprite.Sprite):
         pass
 
 
-class Burst(Particle):
-    """A class for creating burst particle effects."""
-    group = pygame.sprite.Group()
+class BurstFrames:
+    """A lookup table of pre-rendered burst particle frames indexed by color and current side length.
 
-    def __init__(self, surface, position, velocity, side, color, lifespan):
-        super().__init__(surface, position, velocity, side, side, color)
+    Burst particles shrink from their initial side towards zero as their life runs out, so every
+    (color, side, life step) combination resolves to one of a small number of solid squares. These are
+    rendered once and shared by all particles, so drawing a particle is a single blit of a cached Surface.
+    """
+    def __init__(self, colors, side):
         self.side = side
-        self.lifespan = lifespan
-        self.life = lifespan
+        self.colors = []
+        self.indices = {}
+        self.frames = []
+        for color in colors:
+            self.index(color)
 
-        Burst.group.add(self)
+    @property
+    def stride(self):
+        """Number of frames stored per color, one for each side length from 0 to the maximum side."""
+        return self.side + 1
+
+    def render(self, color):
+        """Renders the frames of every side length for a color."""
+        frames = []
+        for side in range(self.stride):
+            frame = pygame.Surface((side, side))
+            frame.fill(color)
+            frames.append(frame)
+        return frames
+
+    def index(self, color):
+        """Returns the index of a color in the table, rendering its frames on first use."""
+        color = tuple(int(channel) for channel in color)
+        index = self.indices.get(color)
+        if index is None:
+            index = len(self.colors)
+            self.colors.append(color)
+            self.indices[color] = index
+            self.frames.extend(self.render(color))
+        return index
+
+    def reserve(self, side):
+        """Re-renders the table if particles larger than the current maximum side are requested."""
+        if side > self.side:
+            self.side = int(side)
+            self.frames = [frame for color in self.colors for frame in self.render(color)]
+
+    def lookup(self, indices, sizes):
+        """Returns the cached frames for the specified color indices and side lengths."""
+        frames = self.frames
+        return [frames[key] for key in (indices * self.stride + sizes).tolist()]
+
+
+class BurstSystem:
+    """A struct-of-arrays particle system that updates all burst particles in batched operations."""
+    def __init__(self, frames, capacity=1024):
+        self.frames = frames
+        self.count = 0
+        self.capacity = 0
+        self.viewport = pygame.Rect(0, 0, 0, 0)
+
+        self.position = np.zeros((0, 2))
+        self.previous = np.zeros((0, 2))
+        self.velocity = np.zeros((0, 2))
+        self.side = np.zeros(0)
+        self.color = np.zeros(0, dtype=np.intp)
+        self.life = np.zeros(0)
+        self.lifespan = np.zeros(0)
+
+        self.allocate(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def allocate(self, capacity):
+        """Grows the particle arrays to hold the specified number of particles."""
+        for name in ("position", "previous", "velocity", "side", "color", "life", "lifespan"):
+            array = getattr(self, name)
+            resized = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            resized[:self.count] = array[:self.count]
+            setattr(self, name, resized)
+        self.capacity = capacity
+
+    def emit(self, surface, position, num, velocity, side, color, lifespan):
+        """Adds particles to the system. Each property is broadcast to the number of particles.
+
+        The color is either a single RGB color or an array of RGB colors, one for each particle.
+        """
+        color = np.asarray(color)
+        if color.ndim == 1:
+            color = self.frames.index(color)
+        else:
+            colors, inverse = np.unique(color, axis=0, return_inverse=True)
+            color = np.array([self.frames.index(rgb) for rgb in colors])[inverse.ravel()]
+        self.frames.reserve(np.max(side))
+
+        if self.count + num > self.capacity:
+            self.allocate(max(self.capacity * 2, self.count + num))
+
+        added = slice(self.count, self.count + num)
+        self.position[added] = position
+        self.previous[added] = position
+        self.velocity[added] = velocity
+        self.side[added] = side
+        self.color[added] = color
+        self.life[added] = lifespan
+        self.lifespan[added] = lifespan
+        self.count += num
 
-    @classmethod
-    def create(cls, surface, position, num, **kwargs):
-        """A class method to create a default burst effect."""
-        for _ in range(num):
-            speed = random.uniform(1, 5)
-            angle = random.uniform(0, 2 * math.pi)
-            props = {
-                "surface": surface,
-                "position": position,
-                "velocity": (speed * math.cos(angle), speed * math.sin(angle)),
-                "side": random.randint(5, 10),
-                "color": random.choice([
-                    (251, 191, 36),
-                    (249, 115, 22),
-                    (239, 68, 68),
-                    (127, 29, 29),
-                ]),
-                "lifespan": 100,
-            }
-            if kwargs:
-                props.update(kwargs)
-            cls(**props)
-
-    def move(self):
-        """Moves the particle based on its velocity with random movements."""
-        super().move()
-        self.velocity += (random.uniform(-0.5, 0.5), random.uniform(-0.5, 0.5))
-
-    def decay(self):
-        """Reduces the life of the particle."""
-        self.life -= 1
-        if self.life <= 0:
-            self.kill()
+        self.viewport = surface.get_rect()
 
-    def transform(self):
-        """Scales the particle down and updates position."""
-        side = self.side * (self.life / self.lifespan)
-        self.image = pygame.transform.scale(self.image, (side, side))
-        self.rect = self.image.get_rect(center=self.rect.center)
+    def clear(self):
+        """Removes all particles from the system."""
+        self.count = 0
+
+    def sizes(self):
+        """Returns the current side length of each particle, shrinking with the remaining life."""
+        n = self.count
+        return np.floor(self.side[:n] * (self.life[:n] / self.lifespan[:n]))
+
+    def rects(self, alpha=1.0, scale=1.0):
+        """Returns an integer array of (left, top, width, height) rects for each particle, interpolated and scaled."""
+        n = self.count
+        sizes = self.sizes()
+        position = self.position[:n]
+        if alpha < 1:
+            position = self.previous[:n] + (position - self.previous[:n]) * alpha
+        if scale != 1:
+            position = position * scale
+            sizes = np.floor(sizes * scale)
+        rects = np.empty((n, 4), dtype=np.int32)
+        rects[:, :2] = position - sizes[:, None] / 2
+        rects[:, 2] = sizes
+        rects[:, 3] = sizes
+        return rects
 
     def update(self, dt):
-        """Updates the state of the entity."""
-        self.move()
-        self.decay()
-        self.transform()
-        if not self.visible:
-            self.kill()
+        """Moves, jitters, decays and shrinks all particles scaled to dt, removing dead and offscreen particles."""
+        n = self.count
+        if n == 0:
+            return
+
+        scale = dt / reference
+        position = self.position[:n]
+        velocity = self.velocity[:n]
+        life = self.life[:n]
+        side = self.side[:n]
+
+        self.previous[:n] = position
+        position += velocity * scale
+        velocity += rng.array.uniform(-0.5, 0.5, (n, 2)) * scale
+        life -= scale
+
+        half = np.floor(side * (life / self.lifespan[:n])) / 2
+        keep = (
+            (life > 0)
+            & (position[:, 0] - half >= self.viewport.left - side)
+            & (position[:, 0] + half <= self.viewport.right + side)
+            & (position[:, 1] - half >= self.viewport.top - side)
+            & (position[:, 1] + half <= self.viewport.bottom + side)
+        )
+        if not keep.all():
+            self.compact(np.flatnonzero(keep))
+
+    def compact(self, indices):
+        """Keeps only the particles at the specified indices, packing them at the front of the arrays."""
+        num = len(indices)
+        for array in (self.position, self.previous, self.velocity, self.side, self.color, self.life, self.lifespan):
+            array[:num] = array[indices]
+        self.count = num
+
+    def blits(self, alpha=1.0, scale=1.0):
+        """Returns the cached frames and positions to draw the particles with, and the rects of the particles.
+
+        Positions are rows of the rect array, so drawing creates no list per particle for the collector to track.
+        """
+        rects = self.rects(alpha, scale)
+        if not self.count:
+            return [], rects[:, :2], rects
+        frames = self.frames.lookup(self.color[:self.count], rects[:, 2])
+        return frames, rects[:, :2], rects
+
+    def draw(self, surface, alpha=1.0):
+        """Draws all particles onto the surface by blitting their cached frames and returns their rects."""
+        frames, positions, rects = self.blits(alpha)
+        surface.blits(zip(frames, positions), doreturn=False)
+        return rects
+
+
+class Burst:
+    """A class for creating burst particle effects. Particles are stored in a shared BurstSystem instead of sprites."""
+    colors = np.array([
+        (251, 191, 36),
+        (249, 115, 22),
+        (239, 68, 68),
+        (127, 29, 29),
+    ], dtype=np.uint8)
+    system = BurstSystem(frames=BurstFrames(colors, side=10))
+
+    @classmethod
+    def create(cls, surface, position, num, **kwargs):
+        """A class method to create a default burst effect, scaled and capped by the quality governor."""
+        quality = governor.Governor.get_instance()
+        num = quality.bursts(num, alive=len(cls.system))
+        if num == 0:
+            return
+        generator = rng.array
+        speed = generator.uniform(1, 5, num)
+        angle = generator.uniform(0, 2 * math.pi, num)
+        props = {
+            "surface": surface,
+            "position": position,
+            "velocity": np.column_stack((speed * np.cos(angle), speed * np.sin(angle))),
+            "side": generator.integers(5, 10, num, endpoint=True),
+            "color": cls.colors[generator.integers(0, len(cls.colors), num)],
+            "lifespan": 100,
+        }
+        if kwargs:
+            props.update(kwargs)
+        props["lifespan"] = quality.lifespan(props["lifespan"])
+        cls.system.emit(num=num, **props)
 
 
 class Projectile(Particle):
     """A class for creating projectiles."""
     group = pygame.sprite.Group()
 
-    def __init__(self, surface, position, velocity, width, height, color, damage, other):
-        super().__init__(surface, position, velocity, width, height, color)
+    def reset(self, surface, position, velocity, width, height, color, damage, other):
+        super().reset(surface, position, velocity, width, height, color)
         self.damage = damage
         self.other = other
 
@@ -125,7 +365,7 @@ class Projectile(Particle):
 
     def update(self, dt):
         """Updates the state of the projectile."""
-        self.move()
+        self.move(dt)
         self.collide(self.other)
         if not self.visible:
             self.kill()
@@ -133,15 +373,10 @@ class Projectile(Particle):
 
 class Laser(Projectile):
     """A class for creating laser projectiles."""
-    def __init__(self, surface, position, velocity, width, height, color, damage, other):
-        super().__init__(surface, position, velocity, width, height, color, damage, other)
 
 
 class Rocket(Projectile):
     """A class for creating rocket projectiles."""
-    def __init__(self, surface, position, velocity, width, height, color, damage, other):
-        super().__init__(surface, position, velocity, width, height, color, damage, other)
-
     def on_collide(self, collides):
         """Called upon collision. Creates a burst particle effect."""
         super().on_collide(collides)
@@ -151,40 +386,29 @@ class Rocket(Projectile):
             num=1000,
         )
 
+    def reset(self, surface, position, velocity, width, height, color, damage, other):
+        super().reset(surface, position, velocity, width, height, color, damage, other)
+        self.trail = 0.0
+
     def update(self, dt):
-        """Updates the state of the rocket projectile. Creates a trail effect."""
+        """Updates the state of the rocket projectile. Creates a trail effect of 5 particles per reference step."""
         super().update(dt)
+        self.trail += 5 * dt / reference
+        num = int(self.trail)
+        self.trail -= num
         Burst.create(
             surface=self.surface,
             position=(self.rect.left, self.rect.centery),
-            num=5,
+            num=num,
         )
 
 
-class Star(Particle):
-    """A class for creating a star particle. Used for starry background with parallax effect."""
-    group = pygame.sprite.Group()
-
-    def __init__(self, surface, position, velocity, side, color):
-        super().__init__(surface, position, velocity, side, side, color)
-
-    def move(self):
-        """Moves the star from right to left and repositions on the right side when they exit the viewport"""
-        super().move()
-        if not self.visible:
-            self.rect.left = self.viewport.width
-
-    def update(self, dt):
-        """Updates the state of the star particle."""
-        self.move()
-
-
 class Health(Particle):
     """A health particle that restores health to entities upon collision."""
     group = pygame.sprite.Group()
 
-    def __init__(self, surface, position, velocity, side, color, health, other):
-        super().__init__(surface, position, velocity, side, side, color)
+    def reset(self, surface, position, velocity, side, color, health, other):
+        super().reset(surface, position, velocity, side, side, color)
         self.health = health
         self.other = other
 
@@ -204,7 +428,12 @@ class Health(Particle):
 
     def update(self, dt):
         """Updates the state of the health particle."""
-        self.move()
+        self.move(dt)
         self.collide(self.other)
         if not self.visible:
             self.kill()
+
+
+Laser.pool = pools.Pool(Laser, size=256)
+Rocket.pool = pools.Pool(Rocket, size=4)
+Health.pool = pools.Pool(Health, size=8)
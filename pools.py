@@ -0,0 +1,37 @@
+class Pool:
+    """A free-list allocator that recycles objects instead of constructing new ones.
+
+    Pooled classes must be constructible without arguments and implement reset() to reinitialize an
+    instance in place. When the free list runs out, the pool grows by a factor of the objects it has
+    allocated so far. Released objects beyond the limit are discarded instead of kept on the free list.
+    """
+    def __init__(self, cls, size=0, growth=2.0, limit=None):
+        self.cls = cls
+        self.growth = growth
+        self.limit = limit
+        self.free = []
+        self.allocated = 0
+        self.acquired = 0
+        self.grow(size)
+
+    def __len__(self):
+        return len(self.free)
+
+    def grow(self, num):
+        """Pre-allocates a number of blank objects onto the free list."""
+        self.free.extend(self.cls() for _ in range(num))
+        self.allocated += num
+
+    def acquire(self, **kwargs):
+        """Takes an object from the free list and resets it with the specified properties."""
+        if not self.free:
+            self.grow(max(1, int(self.allocated * (self.growth - 1))))
+        obj = self.free.pop()
+        obj.reset(**kwargs)
+        self.acquired += 1
+        return obj
+
+    def release(self, obj):
+        """Returns an object to the free list."""
+        if self.limit is None or len(self.free) < self.limit:
+            self.free.append(obj)
@@ -0,0 +1,164 @@
+import collections
+import contextlib
+import json
+import threading
+import time
+import pygame
+
+
+class Scope:
+    """A context manager that times a named section of a frame."""
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter() - self.start)
+
+
+class Profiler:
+    """Collects named timing scopes per frame, draws a rolling overlay and exports Chrome trace events.
+
+    While disabled, scope() returns a shared no-op context manager and update_group() defers to
+    Group.update, so instrumented code pays only for a method call.
+    """
+    instance = None
+
+    @staticmethod
+    def get_instance():
+        if Profiler.instance is None:
+            Profiler.instance = Profiler()
+        return Profiler.instance
+
+    def __init__(self, history=120, max_events=1000000):
+        self.enabled = False
+        self.overlay = False
+        self.tracing = False
+        self.classes = True
+        self.history = history
+
+        self.timings = {}
+        self.current = {}
+        self.counts = {}
+        self.events = collections.deque(maxlen=max_events)
+        self.threads = {}
+
+        self.scopes = {}
+        self.null = contextlib.nullcontext()
+        self.origin = time.perf_counter()
+        self.font = None
+
+    def trace(self):
+        """Starts collecting timings and recording trace events for export."""
+        self.enabled = True
+        self.tracing = True
+
+    def toggle(self):
+        """Toggles the overlay, collecting timings only while it is visible unless a trace is recorded."""
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self.tracing
+
+    def scope(self, name):
+        """Returns a context manager that times a named section."""
+        if not self.enabled:
+            return self.null
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+
+    def record(self, name, start, duration):
+        """Adds a timed section to the current frame and the trace, on the thread it ran on."""
+        self.current[name] = self.current.get(name, 0) + duration
+        if self.tracing:
+            thread = threading.get_ident()
+            if thread not in self.threads:
+                self.threads[thread] = threading.current_thread().name
+            self.events.append(("X", name, start, duration, thread))
+
+    def count(self, name, value):
+        """Records an object count for the current frame."""
+        if self.enabled:
+            self.counts[name] = value
+
+    def update_group(self, group, dt):
+        """Updates a sprite group, timing the update calls of each sprite class when enabled."""
+        if not (self.enabled and self.classes):
+            group.update(dt)
+            return
+
+        perf_counter = time.perf_counter
+        totals = {}
+        start = perf_counter()
+        for sprite in group.sprites():
+            begin = perf_counter()
+            sprite.update(dt)
+            name = type(sprite).__name__ + ".update"
+            totals[name] = totals.get(name, 0) + perf_counter() - begin
+
+        for name, total in totals.items():
+            self.record(name, start, total)
+            start += total
+
+    def end_frame(self):
+        """Moves the timings of the current frame into the rolling history."""
+        if not self.enabled:
+            return
+        for name in self.timings.keys() | self.current.keys():
+            timings = self.timings.get(name)
+            if timings is None:
+                timings = self.timings[name] = collections.deque(maxlen=self.history)
+            timings.append(self.current.get(name, 0))
+        if self.tracing:
+            now = time.perf_counter()
+            thread = threading.get_ident()
+            for name, value in self.counts.items():
+                self.events.append(("C", name, now, value, thread))
+        self.current.clear()
+
+    def averages(self):
+        """Returns the rolling average time of each scope in milliseconds."""
+        return {name: 1000 * sum(timings) / len(timings) for name, timings in self.timings.items()}
+
+    def draw(self, surface):
+        """Draws the rolling timings and object counts in the top left corner of the surface and returns the area drawn."""
+        if not self.overlay:
+            return None
+        if self.font is None:
+            self.font = pygame.font.Font(None, 22)
+
+        lines = [(name, f"{average:.2f} ms") for name, average in sorted(self.averages().items())]
+        lines += [(name, str(value)) for name, value in sorted(self.counts.items())]
+
+        height = self.font.get_linesize()
+        background = pygame.Surface((320, height * len(lines) + 10), pygame.SRCALPHA)
+        background.fill((0, 0, 0, 160))
+        area = surface.blit(background, (10, 10))
+        for index, (name, value) in enumerate(lines):
+            top = 15 + index * height
+            surface.blit(self.font.render(name, True, (255, 255, 255)), (15, top))
+            text = self.font.render(value, True, (255, 255, 255))
+            surface.blit(text, text.get_rect(topright=(325, top)))
+        return area
+
+    def export(self, path):
+        """Stops tracing and writes the recorded sections and counts to a Chrome trace-event JSON file, by thread."""
+        self.tracing = False
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": thread, "args": {"name": name}}
+            for thread, name in self.threads.items()
+        ]
+        for phase, name, start, value, thread in self.events:
+            event = {"name": name, "ph": phase, "ts": (start - self.origin) * 1e6, "pid": 1, "tid": thread}
+            if phase == "X":
+                event["dur"] = value * 1e6
+            else:
+                event["args"] = {name: value}
+            events.append(event)
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
@@ -0,0 +1,291 @@
+import entities
+import profiler
+import governor
+import time
+import weakref
+import pygame
+from pygame._sdl2 import video
+
+
+profile = profiler.Profiler.get_instance()
+
+
+class BlitBatch:
+    """A draw layer whose (image, position) pairs are gathered into a reused sequence and drawn with one call.
+
+    The sequence is refilled in place every tick instead of going through Group.draw, which rebuilds its
+    arguments and the sprite rect dictionary each time. Positions are copied out of the sprite rects, so the
+    layer can still be drawn after the sprites have moved on. Surface.fblits is used where pygame provides
+    it, unless the drawn rects are needed for dirty rendering.
+    """
+    def __init__(self):
+        self.sequence = []
+
+    def fill(self, sprites, alpha=1.0, scale=1.0):
+        """Captures the images and positions of the sprites in order, interpolated by alpha and at a render scale."""
+        sequence = self.sequence
+        size = len(sequence)
+        count = 0
+        for sprite in sprites:
+            position = sprite.rect.topleft if alpha >= 1 else sprite.interpolate(alpha)
+            if scale == 1:
+                item = (sprite.image, position)
+            else:
+                item = (sprite.scaled(scale), (round(position[0] * scale), round(position[1] * scale)))
+            if count < size:
+                sequence[count] = item
+            else:
+                sequence.append(item)
+            count += 1
+        del sequence[count:]
+
+    def draw(self, surface, dirty=None):
+        """Draws the captured sprites. If a dirty list is passed, the areas drawn are appended to it."""
+        if dirty is not None:
+            dirty.extend(surface.blits(self.sequence))
+        elif hasattr(surface, "fblits"):
+            surface.fblits(self.sequence)
+        else:
+            surface.blits(self.sequence, doreturn=False)
+
+
+class Renderer:
+    """Redraws the whole frame and presents it with a full display flip."""
+    dirty = False
+    scale = 1.0
+    display = True
+
+    def __init__(self, world):
+        self.world = world
+        self.surface = world.surface
+
+    def render(self, alpha=1.0, snapshot=None):
+        """Draws and presents the current frame, or a snapshot of an earlier one."""
+        self.world.draw(alpha=alpha, snapshot=snapshot)
+        with profile.scope("display.flip"):
+            pygame.display.flip()
+
+
+class DirtyRenderer(Renderer):
+    """Clears only the areas drawn in the previous frame and presents only the regions that changed.
+
+    When the dirty area exceeds a fraction of the screen, such as during big bursts, clearing and presenting
+    rect by rect costs more than doing it in one go, so the frame falls back to a full fill and flip.
+    Rects are clipped before clearing, as Surface.fill shifts rects that start off the left or top edge.
+    """
+    dirty = True
+
+    def __init__(self, world, threshold=0.25, background=(0, 0, 0)):
+        super().__init__(world)
+        self.threshold = threshold * self.surface.get_width() * self.surface.get_height()
+        self.background = background
+        self.previous = []
+        self.previous_area = float("inf")
+        self.full_frames = 0
+        self.dirty_frames = 0
+
+    @staticmethod
+    def area(rects):
+        """Returns the summed area of a list of rects, counting overlaps more than once."""
+        return sum(width * height for _, _, width, height in rects)
+
+    def render(self, alpha=1.0, snapshot=None):
+        """Draws the current frame, or a snapshot of an earlier one, and presents the changed regions."""
+        full = self.previous_area > self.threshold
+        if not full:
+            with profile.scope("clear"):
+                fill = self.surface.fill
+                background = self.background
+                bounds = self.surface.get_rect()
+                for rect in self.previous:
+                    fill(background, bounds.clip(rect))
+
+        current = []
+        self.world.draw(clear=full, dirty=current, alpha=alpha, snapshot=snapshot)
+        area = self.area(current)
+
+        if full or self.previous_area + area > self.threshold:
+            with profile.scope("display.flip"):
+                pygame.display.flip()
+            self.full_frames += 1
+        else:
+            with profile.scope("display.update"):
+                pygame.display.update(self.previous + current)
+            self.dirty_frames += 1
+
+        self.previous = current
+        self.previous_area = area
+
+
+class ScaledRenderer(Renderer):
+    """Draws the frame onto a smaller canvas and upscales it to the display in one call.
+
+    The scale is fixed if given, and otherwise follows the quality governor.
+    """
+    def __init__(self, world, scale=None, minimum=0.5, step=0.1, retry=600):
+        super().__init__(world)
+        self.fixed = scale
+        self.minimum = minimum
+        self.step = step
+        self.retry = retry
+        self.scale = scale or 1.0
+        self.canvas = None
+        self.costs = {}
+        self.frame = 0
+        self.last = None
+
+    def choose(self):
+        """Returns the scale asked for by the governor, or a higher one that was measured to render faster."""
+        target = governor.Governor.get_instance().resolution(self.minimum, self.step)
+        fresh = {scale: cost for scale, (cost, frame) in self.costs.items() if self.frame - frame < self.retry}
+        for scale in (target, 1.0):
+            if scale not in fresh:
+                return scale
+        return min((scale for scale in fresh if scale >= target), key=fresh.get)
+
+    def resize(self, scale):
+        """Returns the canvas for a scale, or None at full scale, creating it when the scale changes."""
+        if scale == 1:
+            return None
+        width, height = self.surface.get_size()
+        size = (round(width * scale), round(height * scale))
+        if self.canvas is None or self.canvas.get_size() != size:
+            self.canvas = pygame.Surface(size, 0, self.surface)
+        return self.canvas
+
+    def render(self, alpha=1.0, snapshot=None):
+        """Draws the current frame, or a snapshot of an earlier one, at the render scale and presents it."""
+        start = time.perf_counter()
+        if self.fixed is None:
+            self.scale = self.choose()
+        if snapshot is None:
+            snapshot = self.world.snapshot
+            self.world.capture(snapshot, alpha, scale=self.scale)
+        profile.count("render scale", round(100 * snapshot.scale))
+
+        self.world.draw(snapshot=snapshot, canvas=self.resize(snapshot.scale))
+        with profile.scope("display.flip"):
+            pygame.display.flip()
+
+        if snapshot.scale == self.last:
+            cost = time.perf_counter() - start
+            previous = self.costs.get(snapshot.scale)
+            if previous and self.frame - previous[1] < self.retry:
+                cost = previous[0] * 0.9 + cost * 0.1
+            self.costs[snapshot.scale] = (cost, self.frame)
+        self.last = snapshot.scale
+        self.frame += 1
+
+
+class TextureRenderer(Renderer):
+    """Composites the frame with an SDL renderer in a window of its own, drawing every image as a textured quad.
+
+    Images are uploaded as textures the first time they are drawn and composited by the renderer driver, on
+    the GPU wherever an accelerated one exists. Burst particles are drawn with a one pixel texture of their
+    color stretched to their current size. Stars are filled from the star rects captured as for dirty
+    rendering, which costs far less than blending whole starfield layers. The display surface is only kept,
+    hidden, to convert images and size the world. The driver is chosen by SDL unless named, such as "software".
+    """
+    dirty = True
+    display = False
+
+    def __init__(self, world, driver=None):
+        super().__init__(world)
+        self.window = video.Window(pygame.display.get_caption()[0], size=self.surface.get_size())
+        index = -1
+        if driver:
+            index = [info.name for info in video.get_drivers()].index(driver)
+        self.renderer = video.Renderer(self.window, index=index)
+        self.textures = weakref.WeakKeyDictionary()
+        self.solids = {}
+        self.overlay = None
+
+    def texture(self, image):
+        """Returns the texture of an image, uploading it on first use. Images must not change once drawn."""
+        texture = self.textures.get(image)
+        if texture is None:
+            texture = self.textures[image] = video.Texture.from_surface(self.renderer, image)
+        return texture
+
+    def solid(self, frame):
+        """Returns a one pixel texture in the color of a solid burst frame."""
+        texture = self.textures.get(frame)
+        if texture is None:
+            color = tuple(frame.get_at((0, 0)))
+            texture = self.solids.get(color)
+            if texture is None:
+                pixel = pygame.Surface((1, 1))
+                pixel.fill(color)
+                texture = self.solids[color] = video.Texture.from_surface(self.renderer, pixel)
+            self.textures[frame] = texture
+        return texture
+
+    def blits(self, sequence):
+        """Draws a sequence of (image, position) pairs as textured quads."""
+        texture = self.texture
+        for image, position in sequence:
+            texture(image).draw(dstrect=position)
+
+    def render(self, alpha=1.0, snapshot=None):
+        """Composites the current frame, or a snapshot of an earlier one, and presents it."""
+        if snapshot is None:
+            snapshot = self.world.snapshot
+            self.world.capture(snapshot, alpha, dirty=True)
+
+        renderer = self.renderer
+        with profile.scope("clear"):
+            renderer.draw_color = (0, 0, 0, 255)
+            renderer.clear()
+        with profile.scope("Starfield.draw"):
+            renderer.draw_color = (*self.world.starfield.color, 255)
+            for rect in snapshot.star_rects:
+                renderer.fill_rect(rect)
+        with profile.scope("Burst.system.draw"):
+            frames, _, rects = snapshot.bursts
+            solid = self.solid
+            for frame, rect in zip(frames, rects):
+                if rect[2]:
+                    solid(frame).draw(dstrect=rect)
+        with profile.scope("Particle.group.draw"):
+            self.blits(snapshot.particles.sequence)
+        with profile.scope("Entity.group.draw"):
+            self.blits(snapshot.entities.sequence)
+            background, filled = entities.Entity.healthbar_colors
+            for area, health in snapshot.healthbars:
+                renderer.draw_color = (*background, 255)
+                renderer.fill_rect(area)
+                renderer.draw_color = (*filled, 255)
+                renderer.fill_rect(health)
+
+        if profile.overlay:
+            if self.overlay is None:
+                self.overlay = pygame.Surface((340, self.surface.get_height()), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 0))
+            area = profile.draw(self.overlay)
+            video.Texture.from_surface(renderer, self.overlay.subsurface(area)).draw(dstrect=area.topleft)
+
+        with profile.scope("present"):
+            renderer.present()
+
+
+def resolve(name, scale=None):
+    """Returns the class of the renderer chosen on the command line. A fixed scale implies the scaled renderer."""
+    return ScaledRenderer if scale else renderers[name]
+
+
+def create(name, world, scale=None, driver=None):
+    """Returns the renderer chosen on the command line, as resolved from its name and scale."""
+    cls = resolve(name, scale)
+    if cls is ScaledRenderer:
+        return cls(world, scale=scale or None)
+    if cls is TextureRenderer:
+        return cls(world, driver=driver)
+    return cls(world)
+
+
+renderers = {
+    "full": Renderer,
+    "dirty": DirtyRenderer,
+    "scaled": ScaledRenderer,
+    "texture": TextureRenderer,
+}
@@ -0,0 +1,112 @@
+import controllers
+import governor
+import struct
+import zlib
+import pygame
+
+
+magic = b"SIRP"
+version = 1
+header = struct.Struct("<4sBqI")
+frame = struct.Struct("<BbbHB")
+"""Per-frame record: input flags, x and y axes scaled to -127..127, dt in 10 microsecond units and quality."""
+
+flags = ("up", "down", "left", "right", "laser", "rocket", "quit", "overlay")
+
+
+def quantize_axis(value):
+    """Scales an axis value from -1..1 to a signed byte."""
+    return max(-127, min(127, round(value * 127)))
+
+
+class Recorder:
+    """An input source that passes through another source, recording every frame for a replay file.
+
+    Axis values, dt and the governor quality are quantized before the game sees them, so playing the replay
+    back reproduces the recorded session exactly.
+    """
+    def __init__(self, source, seed):
+        self.source = source
+        self.seed = seed
+        self.frames = bytearray()
+        self.dt = 0
+        self.quality = 255
+        self.state = source.state
+
+    def __len__(self):
+        return len(self.frames) // frame.size
+
+    def timestep(self, dt):
+        """Quantizes the dt and governor quality of the next frame."""
+        self.dt = max(0, min(65535, round(dt * 100000)))
+        quality = governor.Governor.get_instance()
+        self.quality = round(quality.quality * 255)
+        quality.quality = self.quality / 255
+        return self.dt / 100000
+
+    def poll(self):
+        """Reads the input for the current frame from the source and records it."""
+        state = self.source.poll()
+        axis_x = quantize_axis(state.axis_x)
+        axis_y = quantize_axis(state.axis_y)
+        state.axis_x = axis_x / 127
+        state.axis_y = axis_y / 127
+
+        bits = 0
+        for index, name in enumerate(flags):
+            if getattr(state, name):
+                bits |= 1 << index
+        self.frames += frame.pack(bits, axis_x, axis_y, self.dt, self.quality)
+
+        self.state = state
+        return state
+
+    def save(self, path):
+        """Writes the recorded frames to a compressed replay file."""
+        with open(path, "wb") as file:
+            file.write(header.pack(magic, version, self.seed, len(self)))
+            file.write(zlib.compress(bytes(self.frames), 9))
+
+
+class Replay:
+    """An input source that plays back a replay file frame by frame, quitting when it runs out."""
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            data = file.read()
+        file_magic, file_version, self.seed, count = header.unpack_from(data)
+        if file_magic != magic or file_version != version:
+            raise ValueError(f"{path} is not a version {version} replay file")
+        self.frames = list(frame.iter_unpack(zlib.decompress(data[header.size:])))[:count]
+        self.index = 0
+        self.state = controllers.InputState()
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def finished(self):
+        """Checks if every recorded frame has been played."""
+        return self.index >= len(self.frames)
+
+    def timestep(self, dt):
+        """Returns the recorded dt of the next frame and applies its governor quality."""
+        if self.finished:
+            return dt
+        _, _, _, step, quality = self.frames[self.index]
+        governor.Governor.get_instance().quality = quality / 255
+        return step / 100000
+
+    def poll(self):
+        """Returns the recorded input of the current frame."""
+        closed = bool(pygame.event.get((pygame.QUIT, pygame.WINDOWCLOSE)))
+        if self.finished:
+            self.state = controllers.InputState(quit=True)
+            return self.state
+
+        bits, axis_x, axis_y, _, _ = self.frames[self.index]
+        self.state = controllers.InputState(axis_x=axis_x / 127, axis_y=axis_y / 127)
+        for index, name in enumerate(flags):
+            setattr(self.state, name, bool(bits & (1 << index)))
+        self.state.quit = self.state.quit or closed
+        self.index += 1
+        return self.state
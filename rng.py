@@ -0,0 +1,18 @@
+import random as python_random
+import numpy as np
+
+
+random = python_random.Random()
+array = np.random.default_rng()
+
+
+def use(generator):
+    """Shares a random.Random instance between all game modules and derives the NumPy generator from it."""
+    global random, array
+    random = generator
+    array = np.random.default_rng(generator.getrandbits(64))
+
+
+def seed(value=None):
+    """Seeds the shared generators so a run can be reproduced."""
+    use(python_random.Random(value))
@@ -0,0 +1,72 @@
+import heapq
+import itertools
+
+
+class Timer:
+    """A callback scheduled at a point in simulation time. It stays active until it runs or is cancelled."""
+    def __init__(self, time, callback, args):
+        self.time = time
+        self.callback = callback
+        self.args = args
+        self.active = True
+
+
+class Scheduler:
+    """A heap of timers keyed on simulation time, so a frame only costs work for the timers that come due.
+
+    Cancelled timers are left in the heap and skipped when popped. The heap is rebuilt without them once
+    they make up more than half of it.
+    """
+    instance = None
+
+    @staticmethod
+    def get_instance():
+        if Scheduler.instance is None:
+            Scheduler.instance = Scheduler()
+        return Scheduler.instance
+
+    def __init__(self):
+        self.time = 0.0
+        self.heap = []
+        self.counter = itertools.count()
+        self.cancelled = 0
+        self.fired = 0
+
+    def __len__(self):
+        return len(self.heap) - self.cancelled
+
+    def schedule(self, delay, callback, *args):
+        """Runs a callback with the arguments once the delay in seconds has elapsed and returns its Timer."""
+        timer = Timer(self.time + max(0, delay), callback, args)
+        heapq.heappush(self.heap, (timer.time, next(self.counter), timer))
+        return timer
+
+    def cancel(self, timer):
+        """Cancels a pending timer."""
+        if timer is not None and timer.active:
+            timer.active = False
+            self.cancelled += 1
+            if self.cancelled > len(self.heap) // 2:
+                self.heap[:] = [entry for entry in self.heap if entry[2].active]
+                heapq.heapify(self.heap)
+                self.cancelled = 0
+
+    def advance(self, dt):
+        """Moves simulation time forward and runs the callbacks that came due, in order of their time."""
+        self.time += dt
+        heap = self.heap
+        while heap and heap[0][0] <= self.time:
+            timer = heapq.heappop(heap)[2]
+            if not timer.active:
+                self.cancelled -= 1
+                continue
+            timer.active = False
+            self.fired += 1
+            timer.callback(*timer.args)
+
+    def clear(self):
+        """Drops every timer and rewinds simulation time to zero."""
+        self.time = 0.0
+        self.heap = []
+        self.cancelled = 0
+        self.fired = 0
@@ -1,7 +1,108 @@
+import assets
+import profiler
+import contextlib
+import hashlib
+import mmap
+import os
+import threading
+import time
 import pygame
 
 
+class Voice:
+    """A sound effect playing on a mixer channel."""
+    def __init__(self, name, channel, sound, priority, start):
+        self.name = name
+        self.channel = channel
+        self.sound = sound
+        self.priority = priority
+        self.start = start
+
+    @property
+    def playing(self):
+        """Checks if the channel is still playing this voice."""
+        return self.channel.get_busy() and self.channel.get_sound() is self.sound
+
+    @property
+    def volume(self):
+        """The effective volume of the voice."""
+        return self.channel.get_volume() * self.sound.get_volume()
+
+
+class VoiceManager:
+    """Allocates mixer channels to sound effects with per-effect limits and voice stealing.
+
+    Each effect has a priority, a maximum number of concurrent voices and a minimum retrigger interval.
+    Plays within the interval are dropped. An effect at its voice limit steals its own oldest voice. When
+    every channel is busy, the quietest, then oldest voice of the lowest priority not above the new
+    effect's is stolen, otherwise the play is dropped.
+    """
+    def __init__(self, channels):
+        self.channels = [pygame.mixer.Channel(index) for index in range(channels)]
+        self.config = {}
+        self.voices = []
+        self.last = {}
+        self.stats = {}
+
+    def configure(self, name, priority=0, voices=4, interval=0.0):
+        """Sets the priority, maximum concurrent voices and minimum retrigger interval of an effect."""
+        self.config[name] = {"priority": priority, "voices": voices, "interval": interval}
+
+    def count(self, name, key):
+        """Increments a play counter of an effect."""
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = {"played": 0, "dropped": 0, "stolen": 0}
+        stats[key] += 1
+
+    def totals(self):
+        """Returns the number of played, dropped and stolen plays over all effects."""
+        totals = {"played": 0, "dropped": 0, "stolen": 0}
+        for stats in self.stats.values():
+            for key, value in stats.items():
+                totals[key] += value
+        return totals
+
+    def steal(self, voice):
+        """Stops a voice so its channel can be reused."""
+        self.voices.remove(voice)
+        voice.channel.stop()
+        self.count(voice.name, "stolen")
+        return voice.channel
+
+    def play(self, name, sound):
+        """Plays a sound effect on a channel chosen by the voice limits, returning the channel or None."""
+        config = self.config.get(name) or {"priority": 0, "voices": len(self.channels), "interval": 0.0}
+        now = time.perf_counter()
+        if now - self.last.get(name, float("-inf")) < config["interval"]:
+            self.count(name, "dropped")
+            return None
+
+        self.voices = [voice for voice in self.voices if voice.playing]
+        own = [voice for voice in self.voices if voice.name == name]
+
+        if len(own) >= config["voices"]:
+            channel = self.steal(min(own, key=lambda voice: voice.start))
+        else:
+            busy = {voice.channel for voice in self.voices}
+            channel = next((channel for channel in self.channels
+                            if channel not in busy and not channel.get_busy()), None)
+            if channel is None:
+                candidates = [voice for voice in self.voices if voice.priority <= config["priority"]]
+                if not candidates:
+                    self.count(name, "dropped")
+                    return None
+                channel = self.steal(min(candidates, key=lambda voice: (voice.priority, voice.volume, voice.start)))
+
+        channel.play(sound)
+        self.voices.append(Voice(name, channel, sound, config["priority"], now))
+        self.last[name] = now
+        self.count(name, "played")
+        return channel
+
+
 class Audio:
+    """A class for handling audio, with decoded sound effects cached on disk and music streamed."""
     instance = None
 
     @staticmethod
@@ -10,61 +111,119 @@ class Audio:
             Audio.instance = Audio()
         return Audio.instance
 
-    """A class for handling audio."""
-    def __init__(self, music_volume=0.5, sfx_volume=0.5):
+    def __init__(self, music_volume=0.5, sfx_volume=0.5, cache=".cache/audio"):
         pygame.mixer.init()
 
         pygame.mixer.set_num_channels(32)
-
-        self.music_channel = pygame.mixer.Channel(0)
-        self.music_channel.set_volume(music_volume)
+        self.voices = VoiceManager(32)
 
         self.music_volume = music_volume
         self.sfx_volume = sfx_volume
         self.sound_effects = {}
+        self.pending = {}
+        self.music = None
+        self.cache = cache
 
         pygame.mixer.music.set_volume(self.music_volume)
 
+    def decode(self, file_path):
+        """Returns a Sound for a file, reading the decoded samples from the disk cache when possible.
+
+        The cache is best effort, so a cache that cannot be read or written falls back to decoding the file.
+        """
+        if not self.cache:
+            return pygame.mixer.Sound(file_path)
+
+        with open(file_path, "rb") as file:
+            digest = hashlib.sha1(file.read()).hexdigest()
+        frequency, size, channels = pygame.mixer.get_init()
+        name = os.path.basename(file_path)
+        path = os.path.join(self.cache, f"{name}-{digest}-{frequency}_{size}_{channels}.pcm")
+
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    return pygame.mixer.Sound(buffer=buffer)
+        except OSError:
+            return pygame.mixer.Sound(file_path)
+
+        sound = pygame.mixer.Sound(file_path)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache, exist_ok=True)
+            for entry in os.listdir(self.cache):
+                if entry.startswith(f"{name}-") and entry.endswith(".pcm"):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(os.path.join(self.cache, entry))
+            with open(temporary, "wb") as file:
+                file.write(sound.get_raw())
+            os.replace(temporary, path)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.remove(temporary)
+        return sound
+
     def load_music(self, music_file):
-        """Loads a music file for background music."""
-        self.music = pygame.mixer.Sound(music_file)
+        """Opens a music file for streaming as background music."""
+        pygame.mixer.music.load(music_file)
+        self.music = music_file
 
     def play_music(self, loops=-1):
         """Plays the loaded background music. -1 means loop indefinitely."""
         if self.music:
-            self.music_channel.play(self.music, loops=loops)
+            pygame.mixer.music.play(loops=loops)
 
     def stop_music(self):
         """Stops the background music."""
-        self.music_channel.stop()
+        pygame.mixer.music.stop()
 
     def pause_music(self):
         """Pauses the background music."""
-        self.music_channel.pause()
+        pygame.mixer.music.pause()
 
     def resume_music(self):
         """Unpauses the background music."""
-        self.music_channel.unpause()
+        pygame.mixer.music.unpause()
 
     def set_music_volume(self, volume):
         """Sets the background music volume (0.0 to 1.0)."""
         self.music_volume = volume
-        self.music_channel.set_volume(self.music_volume)
+        pygame.mixer.music.set_volume(self.music_volume)
 
     def load_sfx(self, name, file_path):
         """Loads a sound effect and stores it by name."""
-        sound = pygame.mixer.Sound(file_path)
+        sound = self.decode(file_path)
         sound.set_volume(self.sfx_volume)
         self.sound_effects[name] = sound
 
+    def preload_sfx(self, name, file_path):
+        """Starts decoding a sound effect in the background. It stays silent until it is decoded."""
+        self.sound_effects[name] = None
+        assets.Loader.get_instance().submit(file_path, self.decode, file_path)
+        self.pending[name] = file_path
+
+    def collect(self, name):
+        """Returns a preloaded sound effect if it has finished decoding."""
+        sound = assets.Loader.get_instance().result(self.pending[name], wait=False)
+        if sound:
+            sound.set_volume(self.sfx_volume)
+            self.sound_effects[name] = sound
+            del self.pending[name]
+        return sound
+
     def play_sfx(self, name):
-        """Plays a sound effect by name, checking for an available channel."""
-        channel = pygame.mixer.find_channel()
-        if channel:
-            channel.play(self.sound_effects[name])
+        """Plays a sound effect by name on a channel assigned by the voice manager."""
+        with profiler.Profiler.get_instance().scope("audio"):
+            sound = self.sound_effects.get(name)
+            if sound is None and name in self.pending:
+                sound = self.collect(name)
+            if sound is None:
+                return
+            self.voices.play(name, sound)
 
     def set_sfx_volume(self, volume):
         """Sets the volume for sound effects (0.0 to 1.0)."""
         self.sfx_volume = volume
         for sound in self.sound_effects.values():
-            sound.set_volume(self.sfx_volume)
\ No newline at end of file
+            if sound:
+                sound.set_volume(self.sfx_volume)
\ No newline at end of file
@@ -1,32 +1,60 @@
 import entities
+import assets
 import particles
-import random
-import pygame
+import scheduler
+import rng
 
 
 class Spawner:
-    """A base class to spawn objects."""
+    """A base class to spawn objects on ticks of the shared scheduler."""
     def __init__(self, surface, interval, delta, minimum):
         """Initialize a Spawner instance."""
         self.surface = surface
         self.viewport = surface.get_rect()
-        self.interval = interval
+        self.clock = scheduler.Scheduler.get_instance()
+        self.last = self.clock.time
+        self.tick = None
         self.delta = delta
         self.minimum = minimum
-        self.timer = 0
+        self.interval = interval
+
+    @property
+    def interval(self):
+        """Time between spawns. Changing it reschedules the next spawn relative to the last one."""
+        return self._interval
+
+    @interval.setter
+    def interval(self, value):
+        self._interval = value
+        self.schedule()
+
+    @property
+    def timer(self):
+        """Time elapsed since the last spawn."""
+        return self.clock.time - self.last
+
+    @timer.setter
+    def timer(self, value):
+        self.last = self.clock.time - value
+        self.schedule()
+
+    def schedule(self):
+        """Schedules the next spawn an interval after the last one."""
+        self.clock.cancel(self.tick)
+        self.tick = self.clock.schedule(self.last + self.interval - self.clock.time, self.update)
 
     def spawn(self):
         """Spawns the object. Override in subclass."""
         pass
 
-    def update(self, dt):
-        """Updates the spawner, triggering a spawn if the interval has elapsed and decreases the interval."""
-        self.timer += dt
-        if self.timer >= self.interval:
-            self.spawn()
-            self.timer = 0
-            if self.delta > 0:
-                self.interval = max(self.minimum, self.interval - self.delta)
+    def update(self):
+        """Called by the scheduler when the interval has elapsed. Spawns the object and decreases the interval."""
+        self.spawn()
+        self.last = self.clock.time
+        if self.delta > 0:
+            self.interval = max(self.minimum, self.interval - self.delta)
+        else:
+            self.schedule()
 
 
 class HealthSpawner(Spawner):
@@ -36,13 +64,13 @@ class HealthSpawner(Spawner):
 
     def spawn(self):
         """Spawns a health particle with random health value."""
-        particles.Health(
+        particles.Health.acquire(
             surface=self.surface,
-            position=(self.viewport.width, random.randint(10, self.viewport.height - 10)),
-            velocity=(random.uniform(-7, -3), 0),
+            position=(self.viewport.width, rng.random.randint(10, self.viewport.height - 10)),
+            velocity=(rng.random.uniform(-7, -3), 0),
             side=20,
             color=(34, 197, 94),
-            health=random.randint(25, 75),
+            health=rng.random.randint(25, 75),
             other=entities.Player.group,
         )
 
@@ -52,10 +80,13 @@ class EnemySpawner(Spawner):
     def __init__(self, surface, interval, delta, minimum):
         super().__init__(surface, interval, delta, minimum)
 
+        self.size = (50, 50)
+
+        cache = assets.Assets.get_instance()
         self.images = {
-            "red": pygame.image.load("assets/enemy_red.png"),
-            "yellow": pygame.image.load("assets/enemy_yellow.png"),
-            "green": pygame.image.load("assets/enemy_green.png")
+            "red": cache.image("assets/enemy_red.png", self.size),
+            "yellow": cache.image("assets/enemy_yellow.png", self.size),
+            "green": cache.image("assets/enemy_green.png", self.size),
         }
 
         self.types = [
@@ -83,11 +114,12 @@ class EnemySpawner(Spawner):
         ]
 
     def spawn(self):
-        props = random.choice(self.types)
+        kind = rng.random.randrange(len(self.types))
         entities.Enemy(
             surface=self.surface,
-            position=(self.viewport.width, random.randint(25, self.viewport.height - 25)),
-            width=50, height=50,
-            **props
+            position=(self.viewport.width, rng.random.randint(25, self.viewport.height - 25)),
+            width=self.size[0], height=self.size[1],
+            kind=kind,
+            **self.types[kind]
         )
 